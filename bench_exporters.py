@@ -0,0 +1,216 @@
+import argparse
+import importlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from fake_gitlab import USERS, FakeGitLab
+
+# Each benchmark runs one exporter end to end against the fake server: (module, settings, runner)
+BENCHMARKS = {
+    "first_response": ("first_response", {"backend": "graphql"}, "run_first_response"),
+    "first_response-rest": ("first_response", {"backend": "rest"}, "run_first_response"),
+    "gitlab_export": ("gitlab_export", {}, "run_gitlab_export"),
+    "gitlab_export-first-response": ("gitlab_export", {"include_first_response": True}, "run_gitlab_export"),
+    "new_time": ("new_time", {}, "run_new_time"),
+    "time_export": ("time_export", {"PER_ASSIGNEE": True}, "run_time_export"),
+    "time_export-group": ("time_export", {"PER_ASSIGNEE": False}, "run_time_export"),
+}
+CREATED_AFTER = "2024-04-01"  # The fake server's issues start here
+CREATED_BEFORE = "2024-06-01"
+
+
+def run_first_response(module, groups, output):
+    module.group_id, module.group_path = groups[0], groups[0]
+    module.issues_path = f"groups/{groups[0]}/issues"
+    module.created_after = CREATED_AFTER
+    module.csv_file_path = output
+    rows = 0
+
+    def counted(issues):
+        nonlocal rows
+        for rows, issue in enumerate(issues, start=1):
+            yield issue
+
+    module.write_output(counted(module.get_issues()))
+    return rows
+
+
+def run_gitlab_export(module, groups, output):
+    module.issues_path = f"groups/{groups[0]}/issues"
+    module.created_after, module.created_before = CREATED_AFTER, CREATED_BEFORE
+    module.csv_file_path = output
+    module.log.setLevel("WARNING")
+    columns = module.IssueColumns()
+    issues = module.get_issues(columns=columns)
+    first_responses = module.get_first_responses(issues) if module.include_first_response else None
+    module.write_output(module.process_data(columns, first_responses))
+    return len(issues)
+
+
+def run_new_time(module, groups, output):
+    module.GROUP_IDS = groups
+    module.DATE_WINDOWS = [(CREATED_AFTER, CREATED_BEFORE)]
+    module.CSV_FILE = output
+    issues = list(module.fetch_issues_from_groups(groups, module.DATE_WINDOWS))
+    module.write_output(issues)
+    return len(issues)
+
+
+def run_time_export(module, groups, output):
+    module.GROUP_ID = groups[0]
+    module.ENGINEER_IDS = [user_id for user_id, _ in USERS]
+    module.CSV_FILE = output
+    totals = module.write_output(module.fetch_engineer_issues(module.GROUP_ID, module.ENGINEER_IDS))
+    return sum(count for count, _ in totals.values())
+
+
+def peak_rss_mib():
+    """ Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS) """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_child(name, url, groups, settings, result_path):
+    """ Run one benchmark in this (fresh) process and write its timings to result_path """
+    module_name, defaults, runner = BENCHMARKS[name]
+    module = importlib.import_module(module_name)
+    module.client.api_url = url
+    module.client.graphql_url = url.rsplit("/", 1)[0] + "/graphql"
+    module.client.backoff = 0.0  # Injected errors carry Retry-After; don't add sleeps of our own
+    if hasattr(module, "notes_client"):  # first_response reads notes through its own client
+        module.notes_client.api_url = url
+        module.notes_client.backoff = 0.0
+    for key, value in dict(defaults, **settings).items():
+        if hasattr(module, key):  # --set applies only to the exporters that have the setting
+            setattr(module, key, value)
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        issues = globals()[runner](module, groups, os.path.join(directory, "output.csv"))
+        seconds = time.perf_counter() - started
+    with open(result_path, "w") as file:
+        json.dump({"issues": issues, "seconds": seconds, "peak_rss_mib": peak_rss_mib()}, file)
+
+
+def run_benchmark(gitlab, name, groups, settings, verbose=False):
+    """ Run a benchmark in a subprocess, so peak RSS and module state belong to it alone """
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as file:
+        result_path = file.name
+    try:
+        gitlab.reset()
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--url", gitlab.url,
+                        "--group-ids", ",".join(groups), "--set", json.dumps(settings),
+                        "--result", result_path],
+                       check=True, stdout=None if verbose else subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(result_path) as file:
+            result = json.load(file)
+    finally:
+        os.remove(result_path)
+
+    served = gitlab.stats()
+    result.update(requests=served["requests"], bytes=served["bytes"], statuses=served["statuses"],
+                  issues_per_second=result["issues"] / result["seconds"] if result["seconds"] else 0.0)
+    return result
+
+
+def summarize(runs):
+    """ Median timing of repeated runs; counts come from the first run since they should not vary """
+    result = dict(runs[0])
+    for key in ("seconds", "issues_per_second", "peak_rss_mib"):
+        result[key] = statistics.median(run[key] for run in runs)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """ Names of benchmarks whose throughput fell more than tolerance below the baseline """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and result["issues_per_second"] < before["issues_per_second"] * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def parse_setting(text):
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the exporters against a local fake GitLab server")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run (default all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--groups", type=int, default=2, help="synthetic groups served")
+    parser.add_argument("--issues", type=int, default=2000, help="issues per group")
+    parser.add_argument("--notes", type=int, default=5, help="notes per issue")
+    parser.add_argument("--private-notes", type=int, default=2, help="system/internal notes before the first public one")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds the server adds to every response")
+    parser.add_argument("--max-per-page", type=int, default=100, help="largest page the server hands out")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument("--error-statuses", default="429,502", help="comma-separated statuses to inject")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                        help="override an exporter setting, e.g. --set max_workers=16 (values parsed as JSON)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per benchmark, the median is reported")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="throughput drop counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="show the exporters' own output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--group-ids", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        settings = json.loads(args.settings[0]) if args.settings else {}
+        run_child(args.child, args.url, args.group_ids.split(","), settings, args.result)
+        return
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    settings = dict(parse_setting(text) for text in args.settings)
+
+    groups = [str(i) for i in range(1, args.groups + 1)]
+    gitlab = FakeGitLab(groups=groups, issues=args.issues, notes=args.notes, private_notes=args.private_notes,
+                        latency=args.latency, max_per_page=args.max_per_page, error_rate=args.error_rate,
+                        error_statuses=[int(s) for s in args.error_statuses.split(",")]).start()
+    print(f"{args.groups} group(s) x {args.issues} issues, {args.notes} notes each, "
+          f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} errors")
+    print(f"{'benchmark':<30} {'issues':>7} {'seconds':>8} {'issues/s':>9} {'requests':>9} {'errors':>7} {'peak MiB':>9}")
+
+    results = {}
+    try:
+        for name in names:
+            result = summarize([run_benchmark(gitlab, name, groups, settings, args.verbose)
+                                for _ in range(args.repeat)])
+            results[name] = result
+            errors = sum(count for status, count in result["statuses"].items() if status[0] in "45")
+            print(f"{name:<30} {result['issues']:>7} {result['seconds']:>8.2f} {result['issues_per_second']:>9.1f} "
+                  f"{result['requests']:>9} {errors:>7} {result['peak_rss_mib']:>9.1f}")
+    finally:
+        gitlab.stop()
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print(f"Throughput regressed more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No throughput regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
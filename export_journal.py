@@ -0,0 +1,68 @@
+import json
+import os
+
+
+class ExportJournal:
+    """ Append-only JSON-lines journal of finished export work
+
+    Results are appended as they are produced and a checkpoint line marks
+    the point up to which they are complete (for example the last page whose
+    issues have all been handled). Resuming replays the results up to the
+    last checkpoint and drops anything written after it, since that work
+    will be redone. A checkpoint can also list items that failed before
+    it, so a resumed run retries them instead of skipping them for good.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.rows = []  # Results recovered from a previous run
+        self.checkpoint = None  # Last checkpoint token recovered from a previous run
+        self.failed = []  # Items still failed as of that checkpoint
+        if resume and os.path.exists(path):
+            self._load()
+            self.file = open(path, "a")
+        else:
+            self.file = open(path, "w")
+
+    def _load(self):
+        rows, pending = [], []
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final line from the crash
+                if "row" in entry:
+                    pending.append(entry["row"])
+                elif "checkpoint" in entry:
+                    rows.extend(pending)
+                    pending = []
+                    self.checkpoint = entry["checkpoint"]
+                    self.failed = entry.get("failed", [])
+        self.rows = rows
+        # Rewrite the journal without the unconfirmed tail so it can't be confirmed by a later checkpoint
+        with open(self.path, "w") as file:
+            for row in rows:
+                file.write(json.dumps({"row": row}) + "\n")
+            if self.checkpoint is not None:
+                file.write(self._checkpoint_line(self.checkpoint, self.failed))
+
+    def record(self, row):
+        self.file.write(json.dumps({"row": row}) + "\n")
+
+    def _checkpoint_line(self, token, failed):
+        entry = {"checkpoint": token}
+        if failed:
+            entry["failed"] = list(failed)
+        return json.dumps(entry) + "\n"
+
+    def mark(self, token, failed=()):
+        """ Confirm everything recorded so far and remember where to resume from and what to retry """
+        self.file.write(self._checkpoint_line(token, failed))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self, remove=False):
+        self.file.close()
+        if remove:
+            os.remove(self.path)
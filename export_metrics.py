@@ -0,0 +1,137 @@
+import cProfile
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Seconds, Prometheus-style upper bounds
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(url):
+    """ Group URLs by endpoint: https://host/api/v4/projects/12/issues/3/notes -> /projects/:id/issues/:id/notes """
+    path = url.split("?", 1)[0]
+    if "/api/v4" in path:
+        path = path.split("/api/v4", 1)[1]
+    elif "/api/" in path:
+        path = "/" + path.split("/api/", 1)[1]
+    return ID_SEGMENT.sub("/:id", path)
+
+
+class Metrics:
+    """ Thread-safe counters for one export run: per-endpoint latency, bytes, pages, retries and stage times """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.endpoints = {}  # name -> {"requests", "bytes" (on the wire), "seconds", "buckets", "statuses"}
+        self.counters = {"pages": 0, "retries": 0}
+        self.stages = {}  # name -> [calls, seconds]
+
+    def observe_request(self, url, seconds, size, status):
+        name = endpoint_name(url)
+        with self.lock:
+            endpoint = self.endpoints.get(name)
+            if endpoint is None:
+                endpoint = self.endpoints[name] = {"requests": 0, "bytes": 0, "seconds": 0.0,
+                                                   "buckets": [0] * len(LATENCY_BUCKETS), "statuses": {}}
+            endpoint["requests"] += 1
+            endpoint["bytes"] += size
+            endpoint["seconds"] += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    endpoint["buckets"][index] += 1
+                    break
+            endpoint["statuses"][str(status)] = endpoint["statuses"].get(str(status), 0) + 1
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        """ Time a block as part of a named stage (fetch, parse, transform, write) """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def summary(self):
+        with self.lock:
+            return {
+                "elapsed_seconds": time.time() - self.started,
+                "counters": dict(self.counters),
+                "stages": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.stages.items()},
+                "endpoints": {name: {"requests": e["requests"], "bytes": e["bytes"], "seconds": e["seconds"],
+                                     "latency_buckets": dict(zip(map(str, LATENCY_BUCKETS), e["buckets"])),
+                                     "statuses": dict(e["statuses"])}
+                              for name, e in self.endpoints.items()}
+            }
+
+    def prometheus(self, job):
+        """ Render the summary in the Prometheus textfile-collector format """
+        summary = self.summary()
+        lines = [f'gitlab_export_elapsed_seconds{{job="{job}"}} {summary["elapsed_seconds"]:.3f}']
+        for name, value in summary["counters"].items():
+            lines.append(f'gitlab_export_{name}_total{{job="{job}"}} {value}')
+        for name, stage in summary["stages"].items():
+            lines.append(f'gitlab_export_stage_seconds_total{{job="{job}",stage="{name}"}} {stage["seconds"]:.6f}')
+        for name, endpoint in summary["endpoints"].items():
+            labels = f'job="{job}",endpoint="{name}"'
+            lines.append(f'gitlab_export_response_bytes_total{{{labels}}} {endpoint["bytes"]}')
+            cumulative = 0
+            for bound, count in endpoint["latency_buckets"].items():
+                cumulative += count
+                lines.append(f'gitlab_export_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'gitlab_export_request_seconds_bucket{{{labels},le="+Inf"}} {endpoint["requests"]}')
+            lines.append(f'gitlab_export_request_seconds_sum{{{labels}}} {endpoint["seconds"]:.6f}')
+            lines.append(f'gitlab_export_request_seconds_count{{{labels}}} {endpoint["requests"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, job):
+        """ Write a JSON summary, or a Prometheus textfile when the path ends in .prom """
+        with open(path, "w") as file:
+            if path.endswith(".prom"):
+                file.write(self.prometheus(job))
+            else:
+                json.dump(self.summary(), file, indent=2)
+
+
+metrics = Metrics()  # Shared by the client and the exporter scripts
+
+
+@contextmanager
+def profiling(mode, output="profile.out", top=25):
+    """ Run a block under cProfile or tracemalloc and print the hot spots; mode None does nothing """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+    elif mode == "tracemalloc":
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Memory: {current / 1024 / 1024:.1f} MiB in use, {peak / 1024 / 1024:.1f} MiB peak")
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat)
+    else:
+        yield
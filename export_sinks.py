@@ -0,0 +1,258 @@
+import csv
+import gzip
+import io
+import json
+import os
+from datetime import timedelta
+from issue_record import format_iso
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Only needed for Parquet and Arrow output
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # Only needed for .zst output
+    zstandard = None
+
+DEFAULT_BATCH_SIZE = 1000  # Rows buffered between writes for CSV and NDJSON
+ROW_GROUP_SIZE = 65536  # Rows per Parquet row group / Arrow record batch
+# File suffix -> format, longest first so .ndjson.gz wins over .gz
+SUFFIXES = ((".ndjson.gz", "ndjson.gz"), (".jsonl.gz", "ndjson.gz"), (".ndjson.zst", "ndjson.zst"),
+            (".jsonl.zst", "ndjson.zst"), (".ndjson", "ndjson"), (".jsonl", "ndjson"), (".parquet", "parquet"),
+            (".arrow", "arrow"), (".feather", "arrow"), (".csv", "csv"))
+
+
+class Column:
+    """ One output column: its name, value kind and how CSV shows it
+
+    kind is "string", "int", "float", "timestamp" or "duration"; timestamps
+    and durations are ints in unit ("ms" or "s"), the way the exporters keep
+    them, and become typed columns in Parquet and Arrow. CSV renders them as
+    the scripts always have: ISO timestamps and H:MM:SS durations, unless a
+    text function says otherwise. missing is the CSV text for None.
+    """
+
+    __slots__ = ("name", "kind", "header", "unit", "text", "missing")
+
+    def __init__(self, name, kind="string", header=None, unit="ms", text=None, missing=""):
+        self.name = name
+        self.kind = kind
+        self.header = header or name
+        self.unit = unit
+        self.text = text
+        self.missing = missing
+
+    def csv_value(self, value):
+        if value is None:
+            return self.missing
+        if self.text:
+            return self.text(value)
+        if self.kind == "timestamp":
+            return format_iso(value if self.unit == "ms" else value * 1000)
+        if self.kind == "duration":
+            return str(timedelta(milliseconds=value) if self.unit == "ms" else timedelta(seconds=value))
+        return value
+
+    def json_value(self, value):
+        """ ISO strings for timestamps and seconds for durations, everything else as is """
+        if value is None:
+            return None
+        if self.kind == "timestamp":
+            return format_iso(value if self.unit == "ms" else value * 1000)
+        if self.kind == "duration":
+            return value / 1000 if self.unit == "ms" else value
+        return value
+
+    def arrow_type(self):
+        return {
+            "string": pa.string(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "timestamp": pa.timestamp(self.unit, tz="UTC"),
+            "duration": pa.duration(self.unit)
+        }[self.kind]
+
+
+def infer_format(path):
+    """ Output format from a file name, CSV when the suffix isn't one we know """
+    lower = path.lower()
+    for suffix, format in SUFFIXES:
+        if lower.endswith(suffix):
+            return format
+    return "csv"
+
+
+def sibling_path(path, name):
+    """ Path for an extra table next to the main output: report.parquet -> report.totals.parquet """
+    lower = path.lower()
+    for suffix, _ in SUFFIXES:
+        if lower.endswith(suffix):
+            return f"{path[:-len(suffix)]}.{name}{path[-len(suffix):]}"
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}{extension}"
+
+
+class Sink:
+    """ Collects rows (value sequences in column order) and writes them in batches """
+
+    format = None
+
+    def __init__(self, path, columns, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.columns = columns
+        self.batch_size = batch_size
+        self.batch = []
+
+    def write(self, row):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if self.batch:
+            self.write_batch(self.batch)
+            self.batch = []
+
+    def write_batch(self, rows):
+        raise NotImplementedError
+
+    def table(self, name, columns):
+        """ Start another table; for most formats that means a sibling file named after it """
+        return open_sink(sibling_path(self.path, name), columns, self.format, self.batch_size)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(Sink):
+    """ CSV with the scripts' usual headers; extra tables follow the first after a blank row """
+
+    format = "csv"
+
+    def __init__(self, path, columns, batch_size=DEFAULT_BATCH_SIZE, file=None):
+        super().__init__(path, columns, batch_size)
+        self.owns_file = file is None
+        self.file = open(path, "w", newline="") if file is None else file
+        self.writer = csv.writer(self.file)
+        if not self.owns_file:
+            self.writer.writerow([])
+        self.writer.writerow([column.header for column in columns])
+
+    def write_batch(self, rows):
+        columns = self.columns
+        self.writer.writerows([column.csv_value(value) for column, value in zip(columns, row)] for row in rows)
+        self.file.flush()  # Let partial output show up while the export runs
+
+    def table(self, name, columns):
+        self.flush()
+        return CsvSink(self.path, columns, self.batch_size, file=self.file)
+
+    def close(self):
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+
+
+class NdjsonSink(Sink):
+    """ One JSON object per line, optionally gzip or zstd compressed """
+
+    def __init__(self, path, columns, batch_size=DEFAULT_BATCH_SIZE, format="ndjson"):
+        super().__init__(path, columns, batch_size)
+        self.format = format
+        if format == "ndjson.gz":
+            self.file = gzip.open(path, "wt", encoding="utf-8")
+        elif format == "ndjson.zst":
+            if zstandard is None:
+                raise ImportError("zstd-compressed NDJSON needs the zstandard package (pip install zstandard)")
+            self.raw = open(path, "wb")
+            self.file = io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(self.raw), encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, rows):
+        columns = self.columns
+        self.file.write("".join(
+            json.dumps({column.name: column.json_value(value) for column, value in zip(columns, row)}) + "\n"
+            for row in rows))
+
+    def close(self):
+        self.flush()
+        self.file.close()  # Also finishes the zstd frame and closes the raw file
+
+
+class ArrowSink(Sink):
+    """ Arrow IPC file with typed columns, written one record batch at a time """
+
+    format = "arrow"
+
+    def __init__(self, path, columns, batch_size=DEFAULT_BATCH_SIZE):
+        if pa is None:
+            raise ImportError(f"{self.format} output needs the pyarrow package (pip install pyarrow)")
+        # Small batches make for poor columnar files, so buffer at least a row group
+        super().__init__(path, columns, max(batch_size, ROW_GROUP_SIZE))
+        self.schema = pa.schema([(column.name, column.arrow_type()) for column in columns])
+        self.writer = self.open_writer()
+
+    def open_writer(self):
+        return pa.ipc.new_file(self.path, self.schema)
+
+    def record_batch(self, rows):
+        arrays = []
+        for index, column in enumerate(self.columns):
+            values = [row[index] for row in rows]
+            if column.kind == "string":
+                values = [None if value is None else str(value) for value in values]
+            arrays.append(pa.array(values, type=self.schema.field(index).type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def write_batch(self, rows):
+        self.writer.write_batch(self.record_batch(rows))
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetSink(ArrowSink):
+    """ zstd-compressed Parquet with typed columns, one row group per batch """
+
+    format = "parquet"
+
+    def open_writer(self):
+        return pa.parquet.ParquetWriter(self.path, self.schema, compression="zstd")
+
+    def write_batch(self, rows):
+        self.writer.write_table(pa.Table.from_batches([self.record_batch(rows)]))
+
+
+def open_sink(path, columns, format=None, batch_size=DEFAULT_BATCH_SIZE):
+    """ Open an output sink, picking the format from the file name unless one is given
+
+    Formats: "csv", "ndjson", "ndjson.gz", "ndjson.zst", "parquet" and
+    "arrow". The compressed and columnar ones need optional packages
+    (zstandard, pyarrow) and raise ImportError without them.
+    """
+    format = format or infer_format(path)
+    if format == "csv":
+        return CsvSink(path, columns, batch_size)
+    if format in ("ndjson", "ndjson.gz", "ndjson.zst"):
+        return NdjsonSink(path, columns, batch_size, format)
+    if format == "parquet":
+        return ParquetSink(path, columns, batch_size)
+    if format == "arrow":
+        return ArrowSink(path, columns, batch_size)
+    raise ValueError(f"Unknown output format {format!r}")
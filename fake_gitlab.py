@@ -0,0 +1,342 @@
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Synthetic data, the same on every run
+START = datetime(2024, 4, 1)
+LABELS = ("Customer Created", "bug", "feature", "support", "exclude_label")
+USERS = ((111, "Ada Lovelace"), (222, "Grace Hopper"), (333, "Linus Torvalds"), (444, "Margaret Hamilton"))
+PROJECTS_PER_GROUP = 5
+
+ISSUES_PATH = re.compile(r"^/api/v4/groups/([^/]+)/issues$")
+NOTES_PATH = re.compile(r"^/api/v4/projects/(\d+)/issues/(\d+)/notes$")
+
+
+def iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class FakeGitLab:
+    """ Local stand-in for the parts of the GitLab API the exporters use
+
+    Serves synthetic groups over REST (offset and keyset pagination, the
+    issue filters the scripts send, issue notes) and GraphQL (the group
+    issues query in first_response.py). Latency, gzip compression and
+    injected 429/5xx responses are configurable, and every request is
+    counted (with the bytes actually sent) so benchmarks can report how
+    many were issued.
+    """
+
+    def __init__(self, groups=("1",), issues=1000, notes=5, private_notes=2, days=61, latency=0.0,
+                 max_per_page=100, error_rate=0.0, error_statuses=(429, 502), retry_after=0,
+                 description_bytes=200, seed=1, host="127.0.0.1", port=0, compress=False):
+        self.notes = notes
+        self.private_notes = private_notes  # Leading system/internal notes before the first public one
+        self.latency = latency  # Seconds added to every response
+        self.max_per_page = max_per_page
+        self.error_rate = error_rate  # Share of requests answered with one of error_statuses
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.compress = compress  # gzip JSON bodies for clients that accept it, as GitLab does
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.groups = {str(group): self.make_issues(index, issues, days, description_bytes, seed)
+                       for index, group in enumerate(groups)}
+        self.issues_by_iid = {(issue["project_id"], issue["iid"]): issue
+                              for group in self.groups.values() for issue in group}
+        self.reset()
+
+        handler = type("Handler", (FakeGitLabHandler,), {"gitlab": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @staticmethod
+    def make_issues(group_index, count, days, description_bytes, seed):
+        """ Issues for one group, created in order across the date range """
+        issues = []
+        step = timedelta(days=days) / max(count, 1)
+        for i in range(count):
+            rng = random.Random(seed * 1000003 + group_index * 10007 + i)
+            created = START + step * i
+            closed = created + timedelta(hours=rng.randint(1, 24 * 14)) if rng.random() < 0.6 else None
+            assignee = rng.choice(USERS + (None,))
+            project_id = 100 + group_index * PROJECTS_PER_GROUP + i % PROJECTS_PER_GROUP
+            iid = i // PROJECTS_PER_GROUP + 1
+            merge_requests = [{"web_url": f"https://gitlab.example.com/p/{project_id}/-/merge_requests/{iid}"}] \
+                if rng.random() < 0.3 else []
+            issues.append({
+                "id": group_index * 1000000 + i + 1,
+                "iid": iid,
+                "project_id": project_id,
+                "title": f"Synthetic issue {i + 1}",
+                "description": "x" * description_bytes,
+                "state": "closed" if closed else "opened",
+                "labels": sorted(rng.sample(LABELS, rng.randint(0, 3))),
+                "created_at": iso(created),
+                "updated_at": iso(closed or created + timedelta(hours=1)),
+                "closed_at": iso(closed) if closed else None,
+                "assignee": {"id": assignee[0], "name": assignee[1]} if assignee else None,
+                "time_stats": {"total_time_spent": rng.randint(0, 16) * 900},
+                "references": {"merge_requests": merge_requests},
+                "web_url": f"https://gitlab.example.com/p/{project_id}/-/issues/{iid}"
+            })
+        return issues
+
+    def issue_notes(self, issue):
+        """ Notes oldest first: private_notes system/internal notes, then public replies an hour apart """
+        created = datetime.strptime(issue["created_at"], "%Y-%m-%dT%H:%M:%S.000Z")
+        notes = []
+        for k in range(self.notes):
+            private = k < self.private_notes
+            notes.append({
+                "id": issue["id"] * 100 + k,
+                "body": "note",
+                "system": private and k % 2 == 0,
+                "internal": private and k % 2 == 1,
+                "confidential": private and k % 2 == 1,
+                "created_at": iso(created + timedelta(hours=k + 1))
+            })
+        return notes
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v4"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {"requests": 0, "bytes": 0, "statuses": {}, "endpoints": {}}
+
+    def stats(self):
+        with self.lock:
+            return json.loads(json.dumps(self.counts))
+
+    def count(self, endpoint, status, size):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts["bytes"] += size
+            self.counts["statuses"][str(status)] = self.counts["statuses"].get(str(status), 0) + 1
+            self.counts["endpoints"][endpoint] = self.counts["endpoints"].get(endpoint, 0) + 1
+
+    def injected_error(self):
+        """ Pick an error status for this request, or None to answer normally """
+        if not self.error_rate:
+            return None
+        with self.lock:
+            if self.random.random() < self.error_rate:
+                return self.random.choice(self.error_statuses)
+        return None
+
+    def list_issues(self, group, query):
+        """ Apply the issue list filters and ordering the exporters send """
+        issues = self.groups.get(group)
+        if issues is None:
+            return None
+
+        def arg(name):
+            return query.get(name, [None])[0]
+
+        labels = [label for label in (arg("labels") or "").split(",") if label]
+        excluded = [label for label in (arg("not[labels]") or "").split(",") if label]
+        created_after, created_before = arg("created_after"), arg("created_before")
+        updated_after, state, assignee_id = arg("updated_after"), arg("state"), arg("assignee_id")
+        selected = [
+            issue for issue in issues
+            if (not created_after or issue["created_at"] >= created_after)
+            and (not created_before or issue["created_at"] < created_before)
+            and (not updated_after or issue["updated_at"] >= updated_after)
+            and (not state or state == "all" or issue["state"] == state)
+            and all(label in issue["labels"] for label in labels)
+            and not any(label in issue["labels"] for label in excluded)
+            and (not assignee_id or (issue["assignee"] and str(issue["assignee"]["id"]) == assignee_id))
+        ]
+        order_by = arg("order_by") or "created_at"
+        selected.sort(key=lambda issue: issue[order_by] if order_by in issue else issue["id"],
+                      reverse=arg("sort") != "asc")
+        return selected
+
+    def graphql_issues(self, variables):
+        """ Answer the group issues query from first_response.py """
+        full_path = str(variables.get("fullPath", ""))
+        group = full_path if full_path in self.groups else full_path.rsplit("-", 1)[-1]
+        issues = self.groups.get(group)
+        if issues is None:
+            return {"data": {"group": None}, "errors": [{"message": f"Group {full_path} not found"}]}
+
+        created_after = variables.get("createdAfter")
+        labels = variables.get("labels") or []
+        selected = [issue for issue in issues
+                    if (not created_after or issue["created_at"] >= created_after)
+                    and all(label in issue["labels"] for label in labels)]
+        offset = int(variables.get("after") or 0)
+        page = selected[offset:offset + 100]
+        first_notes = variables.get("notes") or 20
+        nodes = []
+        for issue in page:
+            notes = self.issue_notes(issue)
+            nodes.append({
+                "iid": str(issue["iid"]),
+                "projectId": issue["project_id"],
+                "title": issue["title"],
+                "createdAt": issue["created_at"],
+                "notes": {
+                    "pageInfo": {"hasNextPage": len(notes) > first_notes},
+                    "nodes": [{"createdAt": note["created_at"], "system": note["system"],
+                               "internal": note["internal"]} for note in notes[:first_notes]]
+                }
+            })
+        end = offset + len(page)
+        return {"data": {"group": {"issues": {
+            "pageInfo": {"hasNextPage": end < len(selected), "endCursor": str(end)},
+            "nodes": nodes
+        }}}}
+
+
+class FakeGitLabHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    gitlab = None  # Set on the per-server subclass
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, endpoint, status, body=b"", headers=None):
+        self.gitlab.count(endpoint, status, len(body))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def prelude(self, endpoint):
+        """ Simulated latency and injected failures; True when the request was already answered """
+        if self.gitlab.latency:
+            time.sleep(self.gitlab.latency)
+        status = self.gitlab.injected_error()
+        if status:
+            self.send(endpoint, status, b'{"message":"injected"}',
+                      {"Content-Type": "application/json", "Retry-After": str(self.gitlab.retry_after)})
+            return True
+        return False
+
+    def send_json(self, endpoint, data, headers=None):
+        body = json.dumps(data).encode()
+        etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send(endpoint, 304, headers={"ETag": etag})
+            return
+        headers = dict(headers or {}, **{"Content-Type": "application/json", "ETag": etag})
+        if self.gitlab.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.send(endpoint, 200, body, headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        issues_match = ISSUES_PATH.match(url.path)
+        notes_match = NOTES_PATH.match(url.path)
+        endpoint = "issues" if issues_match else "notes" if notes_match else "other"
+        if self.prelude(endpoint):
+            return
+
+        if issues_match:
+            items = self.gitlab.list_issues(issues_match.group(1), query)
+        elif notes_match:
+            issue = self.gitlab.issues_by_iid.get((int(notes_match.group(1)), int(notes_match.group(2))))
+            items = None if issue is None else self.gitlab.issue_notes(issue)
+            if items is not None and query.get("sort") == ["desc"]:
+                items.reverse()
+        else:
+            items = None
+        if items is None:
+            self.send(endpoint, 404, b'{"message":"404 Not Found"}', {"Content-Type": "application/json"})
+            return
+
+        per_page = min(int(query.get("per_page", ["20"])[0]), self.gitlab.max_per_page)
+        base = f"http://{self.headers.get('Host')}{url.path}"
+        if query.get("pagination") == ["keyset"] and issues_match and query.get("order_by", ["id"]) == ["id"]:
+            id_after = int(query.get("id_after", ["0"])[0])
+            remaining = [item for item in items if item["id"] > id_after]
+            page = remaining[:per_page]
+            headers = {}
+            if len(remaining) > per_page:
+                params = {name: values[0] for name, values in query.items()}
+                params["id_after"] = page[-1]["id"]
+                headers["Link"] = f'<{base}?{urlencode(params)}>; rel="next"'
+            self.send_json(endpoint, page, headers)
+            return
+
+        page_number = max(int(query.get("page", ["1"])[0]), 1)
+        total_pages = max(-(-len(items) // per_page), 1)
+        page = items[(page_number - 1) * per_page:page_number * per_page]
+        headers = {"X-Page": str(page_number), "X-Per-Page": str(per_page), "X-Total": str(len(items)),
+                   "X-Total-Pages": str(total_pages),
+                   "X-Next-Page": str(page_number + 1) if page_number < total_pages else ""}
+        if page_number < total_pages:
+            params = {name: values[0] for name, values in query.items()}
+            params["page"] = page_number + 1
+            headers["Link"] = f'<{base}?{urlencode(params)}>; rel="next"'
+        self.send_json(endpoint, page, headers)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if url.path != "/api/graphql":
+            self.send("other", 404, b'{"message":"404 Not Found"}', {"Content-Type": "application/json"})
+            return
+        if self.prelude("graphql"):
+            return
+        request = json.loads(body or b"{}")
+        if "group(" not in request.get("query", ""):
+            self.send_json("graphql", {"errors": [{"message": "Query not supported by the fake server"}]})
+            return
+        self.send_json("graphql", self.gitlab.graphql_issues(request.get("variables") or {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic GitLab groups for offline testing")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--groups", type=int, default=1, help="groups served, with ids 1..N")
+    parser.add_argument("--issues", type=int, default=1000, help="issues per group")
+    parser.add_argument("--notes", type=int, default=5, help="notes per issue")
+    parser.add_argument("--private-notes", type=int, default=2, help="system/internal notes before the first public one")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--max-per-page", type=int, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument("--error-statuses", default="429,502", help="comma-separated statuses to inject")
+    parser.add_argument("--gzip", action="store_true", help="compress responses for clients that accept gzip")
+    args = parser.parse_args()
+
+    gitlab = FakeGitLab(groups=[str(i) for i in range(1, args.groups + 1)], issues=args.issues, notes=args.notes,
+                        private_notes=args.private_notes, latency=args.latency, max_per_page=args.max_per_page,
+                        error_rate=args.error_rate,
+                        error_statuses=[int(s) for s in args.error_statuses.split(",")], port=args.port,
+                        compress=args.gzip)
+    print(f"Serving {args.groups} group(s) of {args.issues} issues at {gitlab.url}")
+    try:
+        gitlab.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,255 @@
+import argparse
+import sys
 import requests
-import csv
-from datetime import datetime
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from gitlab_client import GitLabClient, GraphQLError
+from http_cache import HttpCache
+from issue_cache import IssueCache
+from export_journal import ExportJournal
+from export_metrics import metrics, profiling
+from export_sinks import Column, open_sink
+from issue_record import IssueRecord, parse_iso
 
 # Configuration
 group_id = "XXX"  # Replace with your Group ID
+group_path = "my-group"  # Full path of the same group, used by the GraphQL backend
 access_token = ""  # Replace with your GitLab Personal Access Token
-base_url = f"https://gitlab.com/api/v4/groups/{group_id}/issues?created_after=2024-05-01&label_name=Customer%20Created"
+api_url = "https://gitlab.com/api/v4"  # Base URL of the GitLab API, for issues
+notes_api_url = "https://code.il2.gamewarden.io/api/v4"  # Base URL notes are read from; set to api_url if they live there too
+issues_path = f"groups/{group_id}/issues"
+created_after = "2024-05-01"
+label = "Customer Created"
 csv_file_path = "/Path/To/File/Goes/Here/output_may.csv"  # Specify your desired CSV path
+output_format = None  # None goes by csv_file_path's suffix: .csv, .ndjson(.gz/.zst), .parquet or .arrow
+max_workers = 8  # Number of notes requests allowed in flight at once
+max_pending = 200  # Issues buffered ahead of the CSV writer
+flush_every = 100  # Rows per write batch; CSV and NDJSON output is flushed after each
+use_cache = False  # Sync issues into a local SQLite store and report from it
+cache_path = "issues.db"
+cache_since = "2024-01-01"  # Oldest creation date kept in the local store
+http_cache_path = None  # e.g. "http_cache.db" to revalidate issues and notes with ETags between runs
+backend = "graphql"  # "graphql" fetches issues with their first notes in one query, "rest" uses one notes call per issue
+graphql_notes = 20  # Notes requested per issue in the GraphQL query
+notes_per_page = 20  # Notes per REST page while scanning for the first public one
+journal_path = "first_response.journal"  # Progress log that --resume continues from
+metrics_path = None  # e.g. "metrics.json", or "metrics.prom" for the Prometheus textfile collector
+profile = None  # "cprofile" or "tracemalloc" to print where time or memory goes
 
-def get_issues():
-    headers = {
-        "Private-Token": access_token
+# Issues with their earliest notes; notes come back oldest first
+ISSUES_QUERY = """
+query($fullPath: ID!, $createdAfter: Time, $labels: [String], $after: String, $notes: Int) {
+  group(fullPath: $fullPath) {
+    issues(createdAfter: $createdAfter, labelName: $labels, includeSubgroups: true,
+           sort: CREATED_ASC, first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        iid
+        projectId
+        title
+        createdAt
+        notes(first: $notes) {
+          pageInfo { hasNextPage }
+          nodes { createdAt system internal }
+        }
+      }
     }
+  }
+}
+"""
+
+# Timestamps and the response time stay typed in Parquet/Arrow output
+OUTPUT_COLUMNS = [
+    Column("issue_title", header="Ticket Title"),
+    Column("created_at", "timestamp", header="Open Time"),
+    Column("first_public_note", "timestamp", header="Comment Time", missing="No public comments"),
+    # A zero response time has always been an empty cell in the CSV; Parquet/Arrow keep the 0
+    Column("time_difference", "duration", header="Time Difference",
+           text=lambda milliseconds: str(timedelta(milliseconds=milliseconds)) if milliseconds else "")
+]
+
+client = GitLabClient(api_url, access_token, pool_size=max_workers + 1,
+                      cache=HttpCache(http_cache_path) if http_cache_path else None)
+notes_client = client if notes_api_url == api_url else GitLabClient(
+    notes_api_url, access_token, pool_size=max_workers, cache=client.cache)
+cache = IssueCache(cache_path) if use_cache else None
+
+def get_first_public_note(issue):
+    """ Return the time of the first public comment on an issue """
+    note = notes_client.first_public_note(issue.project_id, issue.iid, notes_per_page)
+    print(f"Scanned notes for issue {issue.iid}{'' if note else ', none public'}")
+    return parse_iso(note['created_at']) if note else None
+
+def iter_pending_rest(executor, resume=None):
+    """ Yield (record, future, token) with one REST notes lookup per issue; token marks a page's last issue """
+    if use_cache:
+        cache.sync(client, issues_path, {"created_after": cache_since})
+        for issue in cache.issues(issues_path, created_after=created_after, labels=[label]):
+            issue = IssueRecord.from_json(issue)
+            yield issue, executor.submit(get_first_public_note, issue), None
+        return
+
     params = {
+        "created_after": created_after,
+        "labels": label,
         "per_page": 100,
         "order_by": "created_at",
         "sort": "asc"
     }
-    issues = []
+    # Notes are fetched in the background while the next page is requested
+    for data, token in client.iter_pages_resumable(issues_path, params, resume=resume):
+        for index, issue in enumerate(data, start=1):
+            issue = IssueRecord.from_json(issue)
+            yield issue, executor.submit(get_first_public_note, issue), dict(token, backend="rest") if index == len(data) else None
 
-    page = 1
-    while True:  # Pagination using a while loop
-        params["page"] = page
+def iter_pending_graphql(executor, after=None):
+    """ Yield (record, future, token) from paged GraphQL queries that include each issue's first notes """
+    variables = {"fullPath": group_path, "createdAfter": created_after, "labels": [label], "notes": graphql_notes}
+    if after:
+        variables["after"] = after
+    while True:
+        group = client.graphql(ISSUES_QUERY, variables)["group"]
+        if group is None:
+            # GitLab answers a wrong path or a group the token can't see with null, not an error
+            raise GraphQLError(f"group {group_path!r} not found or not visible to this token")
+        issues = group["issues"]
+        token = {"backend": "graphql", "cursor": issues["pageInfo"]["endCursor"]}
+        for index, node in enumerate(issues["nodes"], start=1):
+            issue = IssueRecord(iid=int(node["iid"]), project_id=node["projectId"], title=node["title"],
+                                created_at=parse_iso(node["createdAt"]))
+            future = Future()
+            try:
+                notes = node["notes"]
+                first_public_note = None
+                for note in notes["nodes"]:
+                    if not note["system"] and not note["internal"]:
+                        first_public_note = parse_iso(note["createdAt"])
+                        break
+                more_notes = first_public_note is None and notes["pageInfo"]["hasNextPage"]
+            except (KeyError, TypeError, ValueError) as e:
+                future.set_exception(e)  # A malformed notes payload only fails this issue's row
+            else:
+                if more_notes:
+                    # Every note in the first batch was private, finish this issue over REST
+                    future = executor.submit(get_first_public_note, issue)
+                else:
+                    future.set_result(first_public_note)
+            yield issue, future, token if index == len(issues["nodes"]) else None
+
+        if not issues["pageInfo"]["hasNextPage"]:
+            break
+        variables["after"] = issues["pageInfo"]["endCursor"]
+
+def iter_pending(executor, resume=None):
+    """ Pick the configured backend, dropping back to REST when GraphQL is unavailable """
+    if resume:
+        # Carry on with whichever backend the interrupted run was using
+        if resume["backend"] == "graphql":
+            yield from iter_pending_graphql(executor, resume["cursor"])
+        else:
+            yield from iter_pending_rest(executor, resume)
+        return
+
+    # GraphQL reads notes from the issues host, so it only applies when notes live there too
+    if backend == "graphql" and not use_cache and notes_client.api_url == client.api_url:
+        started = False
         try:
-            response = requests.get(base_url, params=params, headers=headers)
-            response.raise_for_status()
+            for pending in iter_pending_graphql(executor):
+                started = True
+                yield pending
+            return
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching issues on page {page}: {e}")
-            break
+            if started:
+                raise
+            print(f"GraphQL backend unavailable ({e}), falling back to REST")
+    yield from iter_pending_rest(executor)
 
-        data = response.json()
-        if not data:  # Break the loop if no more issues are found on this page
-            break
+def make_row(issue, future):
+    """ Turn an issue and its pending first-note lookup into an output row, or None on failure """
+    try:
+        first_public_note = future.result()
+    except Exception as e:  # Network errors and malformed payloads alike only cost this issue its row
+        print(f"Error fetching notes for issue {issue.iid}: {e!r}")
+        return None
 
-        for issue in data:
-            issue_id = issue['iid']
-            created_at = datetime.strptime(issue['created_at'], '%Y-%m-%dT%H:%M:%S.%fZ')
-            first_public_note = None
-            notes_url = f"https://code.il2.gamewarden.io/api/v4/projects/{issue['project_id']}/issues/{issue_id}/notes"
+    with metrics.stage("transform"):
+        # Epoch milliseconds throughout, the sink decides how to show them
+        time_difference = first_public_note - issue.created_at if first_public_note else None
+        return [issue.title, issue.created_at, first_public_note, time_difference]
 
-            try:
-                notes_response = requests.get(notes_url, headers=headers)
-                notes_response.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                print(f"Error fetching notes for issue {issue_id}: {e}")
-                continue
-
-            notes = notes_response.json()
-            print(f"Fetched {len(notes)} notes for issue {issue_id}")
-
-            for note in notes:
-                if not note.get('system') and not note.get('confidential'):
-                    note_created_at = datetime.strptime(note['created_at'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                    first_public_note = note_created_at
-                    break  # Exit the loop after finding the first public note
-
-            time_difference = None
-            if first_public_note:
-                time_difference = first_public_note - created_at
-
-            issues.append({
-                "issue_title": issue['title'],  # Use issue title instead of ID
-                "created_at": created_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),  # Include opened time
-                "first_public_note": first_public_note.strftime('%Y-%m-%dT%H:%M:%S.%fZ') if first_public_note else "No public comments",
-                "time_difference": str(time_difference) if time_difference else ""  # Formatted time difference
-            })
-
-        page += 1  # Increment to the next page
-
-    return issues
-
-def write_to_csv(issues):
-    with open(csv_file_path, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Ticket Title', 'Open Time', 'Comment Time', 'Time Difference'])  # Updated header
-        for issue in issues:
-            writer.writerow([issue['issue_title'], issue['created_at'],
-                             issue.get('first_public_note', "No public comments"),
-                             issue.get('time_difference', "")])
+def finish(issue, future, token, journal, failed):
+    """ Build the row for an issue and journal it, checkpointing after a page's last issue
+
+    Issues whose row couldn't be built are kept in failed and listed with
+    every checkpoint, so --resume retries them rather than skipping them.
+    """
+    row = make_row(issue, future)
+    if journal:
+        if row:
+            journal.record(row)
+        else:
+            failed.append(issue.as_list())
+        if token:
+            journal.mark(token, failed)
+    return row
+
+def get_issues(journal=None):
+    """ Yield one row per issue, in listing order, as soon as its notes are in """
+    if journal:
+        yield from journal.rows  # Rows finished before an interrupted run stopped
+
+    pending = deque()  # (issue, future, token) in the order the issues were listed
+    failed = []  # Issues without a row, as [IssueRecord.as_list()] for the journal
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if journal:
+            # Issues the interrupted run couldn't finish go first; the next checkpoint confirms their rows
+            for values in journal.failed:
+                issue = IssueRecord.from_list(values)
+                pending.append((issue, executor.submit(get_first_public_note, issue), None))
+        error = None
+        try:
+            for item in iter_pending(executor, journal.checkpoint if journal else None):
+                pending.append(item)
+                # Only keep a bounded number of issues waiting on their notes
+                while len(pending) > max_pending:
+                    row = finish(*pending.popleft(), journal, failed)
+                    if row:
+                        yield row
+        except requests.exceptions.RequestException as e:
+            error = e  # Listing failed; still finish and journal the issues already listed
+
+        while pending:
+            row = finish(*pending.popleft(), journal, failed)
+            if row:
+                yield row
+        if error:
+            raise error
+
+def write_output(rows):
+    with open_sink(csv_file_path, OUTPUT_COLUMNS, output_format, flush_every) as sink:
+        for row in rows:
+            with metrics.stage("write"):
+                sink.write(row)
 
 # Run the script
-issues = get_issues()
-write_to_csv(issues)
-print("Data has been written to CSV.")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export time to first public response for GitLab issues")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export from its journal")
+    args = parser.parse_args()
+
+    journal = ExportJournal(journal_path, resume=args.resume)
+    try:
+        with profiling(profile):
+            write_output(get_issues(journal))
+    except requests.exceptions.RequestException as e:
+        journal.close()
+        print(f"Export interrupted, the output is incomplete: {e}")
+        print("Progress is saved, rerun with --resume to continue.")
+        sys.exit(1)
+    finally:
+        if metrics_path:
+            metrics.write(metrics_path, job="first_response")
+    journal.close(remove=True)
+    print(f"Data has been written to {csv_file_path}.")
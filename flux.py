@@ -1,16 +1,38 @@
+import argparse
+import hashlib
+import json
+import os
+import textwrap
+import threading
+import time
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from git import Repo
 
 # Configuration
 YOUR_API_KEY = "YOUR_API_KEY"
-DATA_FILE_PATH = "data.json"
+DATA_FILE_PATH = "data.json"  # Latest results, sorted by url; only rewritten when they change
+RECORDS_PATH = "records.ndjson"  # Append-only log with a line per new or changed record
+RECORDS_INDEX_PATH = ".flux_index.json"  # Local url -> hash index of the log, rebuilt from it when missing
+SPOOL_PATH = ".flux_results.ndjson"  # This run's results, streamed to disk as pages arrive
 API_URL = "https://api.askflux.ai/v1/query"
+SEARCH_TERMS = ["python"]  # Every term is searched on each run
+PAGE_SIZE = 50  # Results requested per page
+MAX_CONCURRENCY = 4  # Searches run at once, each with one page request in flight
+TIMEOUT = (5, 60)  # (connect, read) seconds
+MAX_RETRIES = 5
+BACKOFF = 1.0  # Seconds, doubled after every failed attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+PUSH_EVERY = 12  # Unpushed commits that trigger a push
+PUSH_MAX_AGE = timedelta(hours=24)  # Push anyway once the oldest unpushed commit is this old
 
-# Query to collect data
-query = """
-{
-  search(query: "python") {
+# Query to collect data, one page at a time
+SEARCH_QUERY = """
+query($query: String!, $first: Int, $after: String) {
+  search(query: $query, first: $first, after: $after) {
+    pageInfo { hasNextPage endCursor }
     results {
       title
       url
@@ -21,36 +43,235 @@ query = """
 }
 """
 
-# Function to fetch data from AskFlux.ai API
-def fetch_data(query):
-    headers = {"Authorization": f"Bearer {YOUR_API_KEY}"}
-    response = requests.post(API_URL, json={"query": query}, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"API request failed with status code: {response.status_code}")
+class FluxClient:
+    """ Pooled AskFlux.ai GraphQL client with timeouts and retries for rate limits and server errors """
+
+    def __init__(self, api_url, api_key, timeout=TIMEOUT, max_retries=MAX_RETRIES, backoff=BACKOFF,
+                 pool_size=MAX_CONCURRENCY):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}"})
+
+    def query(self, query, variables=None):
+        """ Run a GraphQL query and return its data """
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.api_url, json={"query": query, "variables": variables or {}},
+                                             timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+                print(f"Got {response.status_code} from AskFlux.ai, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if response.status_code != 200:
+                raise Exception(f"API request failed with status code: {response.status_code}")
+
+            body = response.json()
+            if body.get("errors"):
+                raise Exception("API query failed: " + "; ".join(e.get("message", "") for e in body["errors"]))
+            return body["data"]
+
+    def search(self, term, page_size=PAGE_SIZE):
+        """ Yield pages of results for one search term, requesting the next page only when asked for it """
+        variables = {"query": term, "first": page_size}
+        while True:
+            search = self.query(SEARCH_QUERY, variables)["search"] or {}
+            yield search.get("results") or []
+            page_info = search.get("pageInfo") or {}  # Absent when the API answers in a single page
+            if not page_info.get("hasNextPage") or not page_info.get("endCursor"):
+                return
+            variables["after"] = page_info["endCursor"]
+
+def canonical(value):
+    """ Stable JSON text: sorted keys, no extra whitespace """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def normalize(result):
+    """ One search result with surrounding whitespace trimmed, so cosmetic changes don't count """
+    return {key: value.strip() if isinstance(value, str) else value for key, value in result.items()}
+
+# Function to run every search at once, streaming results to the spool file as pages arrive
+def fetch_data(client, terms, spool_path):
+    lock = threading.Lock()
+
+    def collect(term_number, term):
+        count = 0
+        for page in client.search(term):
+            # Tagged with where the result was found, so sorted_records can pick one result per url
+            lines = "".join(canonical([term_number, count + position, normalize(result)]) + "\n"
+                            for position, result in enumerate(page))
+            with lock:
+                spool.write(lines)
+                spool.flush()
+            count += len(page)
+        return count
+
+    with open(spool_path, "w", encoding="utf-8") as spool, ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        futures = [executor.submit(collect, term_number, term) for term_number, term in enumerate(terms)]
+        # Every search has to finish, a partial result set would look like deleted records
+        return sum(future.result() for future in futures)
 
-# Function to store data in a JSON file
-def store_data(data, file_path):
-    with open(file_path, "w") as f:
-        f.write(json.dumps(data, indent=4))
+def sorted_records(spool_path):
+    """ Yield the spooled results ordered by url, one per url, holding only keys and offsets in memory
 
-# Function to commit and push changes to Git repository
-def commit_and_push(repo, message):
-    repo.index.add([DATA_FILE_PATH])
+    A url found more than once keeps the result from the earliest search
+    term in SEARCH_TERMS, and within that term the earliest page, so the
+    choice doesn't depend on which search finished first.
+    """
+    entries = []
+    with open(spool_path, "rb") as f:
+        offset = 0
+        for line in f:
+            term_number, position, result = json.loads(line)
+            entries.append((record_key(result), term_number, position, offset, len(line)))
+            offset += len(line)
+    entries.sort()
+
+    previous = None
+    with open(spool_path, "rb") as f:
+        for key, _, _, offset, length in entries:
+            if key == previous:
+                continue  # The same url found again, possibly with different content
+            previous = key
+            f.seek(offset)
+            yield json.loads(f.read(length))[2]
+
+def record_key(record):
+    """ Records are keyed by url; one without a url is keyed by its content """
+    return record.get("url") or "sha256:" + digest(canonical(record))
+
+# Function to store data in a JSON file, skipping the write when nothing changed
+def store_data(records, file_path):
+    """ Stream records into a JSON array; the file is only replaced when its hash changes """
+    new_hash = hashlib.sha256()
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        text = "[]\n"
+        for count, record in enumerate(records):
+            text = ("[\n" if count == 0 else ",\n") + textwrap.indent(
+                json.dumps(record, indent=4, sort_keys=True, ensure_ascii=False), "    ")
+            f.write(text)
+            new_hash.update(text.encode())
+            text = "\n]\n"
+        f.write(text)
+        new_hash.update(text.encode())
+
+    old_hash = hashlib.sha256()
+    if os.path.exists(file_path):
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                old_hash.update(chunk)
+        if old_hash.digest() == new_hash.digest():
+            os.remove(temp_path)
+            return False
+    os.replace(temp_path, file_path)
+    return True
+
+def load_index():
+    """ url -> record hash for everything in the log, reading only what was appended since last time """
+    index = {"offset": 0, "hashes": {}}
+    if os.path.exists(RECORDS_INDEX_PATH):
+        with open(RECORDS_INDEX_PATH) as f:
+            index = json.load(f)
+    size = os.path.getsize(RECORDS_PATH) if os.path.exists(RECORDS_PATH) else 0
+    if size < index["offset"]:
+        index = {"offset": 0, "hashes": {}}  # The log was replaced, start over
+    if size > index["offset"]:
+        with open(RECORDS_PATH, "rb") as f:
+            f.seek(index["offset"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn last line, left for the next append to skip past
+                entry = json.loads(line)
+                index["hashes"][entry["key"]] = entry["hash"]
+                index["offset"] += len(line)
+    return index
+
+def save_index(index):
+    with open(RECORDS_INDEX_PATH, "w") as f:
+        json.dump(index, f)
+
+# Function to append new or changed records to the log
+def append_records(records, index):
+    seen_at = datetime.now().isoformat(timespec="seconds")
+    lines = []
+    for record in records:
+        key, record_hash = record_key(record), digest(canonical(record))
+        if index["hashes"].get(key) != record_hash:
+            index["hashes"][key] = record_hash
+            lines.append(canonical({"key": key, "hash": record_hash, "seen_at": seen_at, "record": record}) + "\n")
+    # Opened even with nothing to add, so the log exists for the first commit of an empty result set
+    with open(RECORDS_PATH, "ab") as f:
+        if f.tell() > index["offset"]:
+            f.truncate(index["offset"])  # Drop a torn line from an interrupted run
+        data = "".join(lines).encode()
+        f.write(data)
+        index["offset"] += len(data)
+    return len(lines)
+
+# Function to commit changes to the Git repository
+def commit(repo, paths, message):
+    repo.index.add(paths)
     repo.index.commit(message)
-    origin = repo.remote("origin")
-    origin.push()
+
+# Function to push once enough commits have piled up, or the oldest has waited long enough
+def push_if_due(repo, force=False):
+    branch = repo.active_branch
+    tracking = branch.tracking_branch()
+    unpushed = list(repo.iter_commits(f"{tracking.name}..{branch.name}")) if tracking else None
+    if unpushed == []:
+        return False
+    due = force or unpushed is None or len(unpushed) >= PUSH_EVERY
+    if not due:
+        oldest = datetime.fromtimestamp(unpushed[-1].committed_date)
+        due = datetime.now() - oldest >= PUSH_MAX_AGE
+    if due:
+        repo.remote("origin").push()
+    return due
 
 # Main execution
 if __name__ == "__main__":
-    data = fetch_data(query)
-    store_data(data, DATA_FILE_PATH)
+    parser = argparse.ArgumentParser(description="Collect AskFlux.ai search results into this repository")
+    parser.add_argument("--push", action="store_true", help="push any unpushed snapshots now")
+    args = parser.parse_args()
+
+    client = FluxClient(API_URL, YOUR_API_KEY)
+    found = fetch_data(client, SEARCH_TERMS, SPOOL_PATH)
+    print(f"Fetched {found} results for {len(SEARCH_TERMS)} search terms.")
 
     # Initialize Git repository
     repo = Repo(".")
 
-    # Commit and push changes
-    commit_and_push(repo, f"Data collected from AskFlux.ai on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    # A dirty snapshot means an earlier run stopped before committing it
+    if store_data(sorted_records(SPOOL_PATH), DATA_FILE_PATH) or \
+            repo.is_dirty(untracked_files=True, path=DATA_FILE_PATH):
+        index = load_index()
+        added = append_records(sorted_records(SPOOL_PATH), index)
+        save_index(index)
+        commit(repo, [DATA_FILE_PATH, RECORDS_PATH],
+               f"Data collected from AskFlux.ai on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Results changed, {added} new or updated records logged and committed.")
+    else:
+        print("Results unchanged since the last run, nothing to commit.")
 
-    print("Data successfully collected and stored in Fun_API_Works repository.")
\ No newline at end of file
+    if push_if_due(repo, force=args.push):
+        print("Pushed to origin.")
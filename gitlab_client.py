@@ -0,0 +1,308 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from export_metrics import metrics
+
+# Defaults shared by the exporter scripts
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) seconds
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0  # Seconds, doubled after every failed attempt
+DEFAULT_POOL_SIZE = 16  # Keep-alive connections kept open per host
+DEFAULT_PAGE_WORKERS = 8  # Offset pages fetched in parallel when the page count is known
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}  # Responses that mean "slow down" rather than "broken"
+DEFAULT_INITIAL_CONCURRENCY = 4  # Requests allowed in flight before the limiter has learned anything
+
+
+class GraphQLError(requests.exceptions.RequestException):
+    """ Raised when a GraphQL response carries errors instead of data """
+
+
+class AdaptiveLimiter:
+    """ AIMD cap on requests in flight, driven by GitLab's rate-limit responses
+
+    Every healthy response grows the cap by roughly one request per round
+    trip; a 429/503 halves it. Only requests sent after the last cut can
+    cut again, so a burst of throttled requests counts once. When
+    RateLimit-Remaining runs out, or the server names a wait, new requests
+    are held until then.
+    """
+
+    def __init__(self, initial=DEFAULT_INITIAL_CONCURRENCY, minimum=1, maximum=DEFAULT_POOL_SIZE,
+                 decrease=0.5):
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """ Wait for a free slot and return the time the request was let through """
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.time()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.time()
+                self.condition.wait(wait if wait > 0 else None)
+
+    def release(self, response=None, started=0.0):
+        with self.condition:
+            self.in_flight -= 1
+            if response is not None:
+                self.observe(response, started)
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        """ Hold every new request for the given number of seconds """
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.condition.notify_all()
+
+    def observe(self, response, started):
+        if response.status_code in THROTTLE_STATUSES:
+            if started >= self.last_decrease:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.last_decrease = time.time()
+        elif response.status_code < 500:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        remaining = response.headers.get("RateLimit-Remaining")
+        reset = response.headers.get("RateLimit-Reset")
+        if remaining and remaining.isdigit() and int(remaining) <= self.in_flight and reset and reset.isdigit():
+            # Out of quota for this window, wait for it to refill instead of collecting 429s
+            self.paused_until = max(self.paused_until, float(reset))
+
+
+def wire_bytes(response):
+    """ Body bytes as they came over the network, before gzip decoding, for a response already read """
+    raw = getattr(response, "raw", None)
+    if raw is not None and hasattr(raw, "tell"):
+        return raw.tell()  # urllib3 counts what it read from the socket, not what it decoded
+    length = response.headers.get("Content-Length")
+    return int(length) if length else len(response.content)
+
+
+class GitLabClient:
+    """ Pooled GitLab REST client with retries for rate limits and server errors """
+
+    def __init__(self, api_url, token, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE, graphql_url=None, limiter=None,
+                 cache=None):
+        self.api_url = api_url.rstrip('/')
+        # The GraphQL endpoint sits next to the REST one: https://host/api/v4 -> https://host/api/graphql
+        self.graphql_url = graphql_url or self.api_url.rsplit('/', 1)[0] + "/graphql"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Shared by every thread using this client, so the scripts' worker pools only set an upper bound
+        self.limiter = limiter or AdaptiveLimiter(maximum=pool_size)
+        self.cache = cache  # Optional http_cache.HttpCache for conditional GETs
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "PRIVATE-TOKEN": token,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip"
+        })
+
+    def url(self, path):
+        """ Build a full URL from an API path, leaving absolute URLs untouched """
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.api_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None):
+        """ GET an API path, retrying 429/5xx responses and connection errors
+
+        With a cache configured the request carries If-None-Match /
+        If-Modified-Since, and a 304 hands back the cached body.
+        """
+        url = self.url(path)
+        if self.cache is None:
+            return self.request("GET", url, params=params)
+
+        key = self.cache.key(url, params, self.session.headers.get("PRIVATE-TOKEN"))
+        entry = self.cache.lookup(key)
+        response = self.request("GET", url, params=params, headers=entry.validators() if entry else None)
+        if response.status_code == 304 and entry:
+            return self.cache.replay(entry, response)
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    def request(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            started = self.limiter.acquire()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.limiter.release()
+                metrics.observe_request(url, time.time() - started, 0, "error")
+                if attempt >= self.max_retries:
+                    raise
+                metrics.count("retries")
+                time.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+                continue
+            except Exception:
+                self.limiter.release()
+                raise
+            self.limiter.release(response, started)
+            elapsed = time.time() - started
+            metrics.observe_request(url, elapsed, wire_bytes(response), response.status_code)
+            metrics.add_stage("fetch", elapsed)
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self.retry_delay(response, attempt)
+                print(f"Got {response.status_code} from {url}, retrying in {delay:.1f}s")
+                if response.status_code in THROTTLE_STATUSES:
+                    self.limiter.pause(delay)  # Everyone waits, not just this request
+                metrics.count("retries")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            return response
+
+    @staticmethod
+    def parse(response):
+        with metrics.stage("parse"):
+            return response.json()
+
+    def get_json(self, path, params=None):
+        return self.parse(self.get(path, params))
+
+    def first_public_note(self, project_id, issue_iid, per_page=20):
+        """ Scan an issue's notes oldest first and return the first public, non-system one, or None """
+        params = {"order_by": "created_at", "sort": "asc", "per_page": per_page}
+        # Pages are requested one at a time, so the scan stops at the first public note
+        for notes in self.iter_pages(f"projects/{project_id}/issues/{issue_iid}/notes", params, workers=1):
+            for note in notes:
+                if not note.get('system') and not note.get('confidential') and not note.get('internal'):
+                    return note
+        return None
+
+    def graphql(self, query, variables=None):
+        """ Run a GraphQL query and return its data, raising GraphQLError on errors """
+        body = self.parse(self.request("POST", self.graphql_url, json={"query": query, "variables": variables or {}}))
+        if body.get("errors"):
+            raise GraphQLError("; ".join(error.get("message", "") for error in body["errors"]))
+        return body["data"]
+
+    def iter_pages(self, path, params=None, keyset=False, workers=DEFAULT_PAGE_WORKERS):
+        """ Yield every page of a list endpoint in order
+
+        With keyset=True the endpoint is asked for keyset pagination and the
+        Link headers are followed. Endpoints without keyset support fall back
+        to offset paging, where the remaining pages are fetched in parallel
+        once X-Total-Pages is known. With workers=1 pages are only requested
+        as the caller asks for them, so stopping early saves the rest.
+        """
+        for data, _ in self.iter_pages_resumable(path, params, keyset, workers):
+            yield data
+
+    def iter_pages_resumable(self, path, params=None, keyset=False, workers=DEFAULT_PAGE_WORKERS, resume=None):
+        """ Like iter_pages, but yield (page, token) pairs
+
+        A token is a small JSON-friendly dict; passing the token of the last
+        page that was fully handled back in as resume carries on after it.
+        """
+        params = dict(params or {})
+        params.setdefault("per_page", 100)
+        params.pop("page", None)
+        if keyset:
+            params["pagination"] = "keyset"
+            params.setdefault("order_by", "id")
+            params.setdefault("sort", "asc")
+
+        if resume is not None:
+            if "next_url" in resume:
+                if resume["next_url"]:
+                    yield from self._iter_keyset(self.get(resume["next_url"]))
+            else:
+                yield from self._iter_offset(path, params, workers, start=resume["page"] + 1)
+            return
+
+        first = None
+        if keyset:
+            try:
+                first = self.get(path, params)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in (400, 405):
+                    raise
+                del params["pagination"]  # Keyset pagination rejected for this ordering
+            if first is not None and "X-Page" not in first.headers:
+                yield from self._iter_keyset(first)
+                return
+            # Otherwise the endpoint ignored the keyset request and answered with offset page 1
+
+        yield from self._iter_offset(path, params, workers, first)
+
+    def _iter_keyset(self, response):
+        while True:
+            next_url = response.links.get("next", {}).get("url")
+            metrics.count("pages")
+            yield self.parse(response), {"next_url": next_url}
+            if not next_url:
+                return
+            response = self.get(next_url)
+
+    def _iter_offset(self, path, params, workers, first=None, start=1):
+        if first is None:
+            first = self.get(path, dict(params, page=start))
+        metrics.count("pages")
+        yield self.parse(first), {"page": start}
+
+        total_pages = first.headers.get("X-Total-Pages")
+        if not total_pages or workers <= 1:
+            # Walk X-Next-Page on demand; GitLab also leaves out the totals for very large result sets
+            next_page = first.headers.get("X-Next-Page")
+            while next_page:
+                response = self.get(path, dict(params, page=int(next_page)))
+                metrics.count("pages")
+                yield self.parse(response), {"page": int(next_page)}
+                next_page = response.headers.get("X-Next-Page")
+            return
+
+        # Keep a window of requests in flight and hand pages back in order
+        remaining = iter(range(start + 1, int(total_pages) + 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            window = deque()
+            for page in remaining:
+                window.append((page, executor.submit(self.get_json, path, dict(params, page=page))))
+                if len(window) >= workers:
+                    break
+            while window:
+                page, future = window.popleft()
+                metrics.count("pages")
+                yield future.result(), {"page": page}
+                page = next(remaining, None)
+                if page is not None:
+                    window.append((page, executor.submit(self.get_json, path, dict(params, page=page))))
+
+    def close(self):
+        self.session.close()
+
+    def retry_delay(self, response, attempt):
+        """ Work out how long to wait before retrying, preferring the server's own hints """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+
+        reset = response.headers.get("RateLimit-Reset")  # Unix time when the quota refills
+        if reset and reset.isdigit():
+            return max(float(reset) - time.time(), 0) + 0.5
+
+        return self.backoff * 2 ** attempt
@@ -1,85 +1,180 @@
+import argparse
+import json
+import logging
+import sys
 import requests
-import csv
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from gitlab_client import GitLabClient
+from export_journal import ExportJournal
+from export_metrics import metrics, profiling
+from export_sinks import Column, open_sink
+from http_cache import HttpCache
+from issue_cache import IssueCache
+from issue_record import IssueRecord, parse_iso
+from issue_stats import BREAKDOWNS, PERCENTILES, IssueColumns, compute_stats
 
 # Configuration
 group_id = "XXX"  # Project ID or Group ID
 access_token = ""
-base_url = f"https://gitlab.com/api/v4/groups/{group_id}/issues?created_after=2024-04-01&created_before=2024-05-01"
+api_url = "https://gitlab.com/api/v4"  # Base URL of the GitLab API
+issues_path = f"groups/{group_id}/issues"
+created_after = "2024-04-01"
+created_before = "2024-05-01"
 csv_file_path = "/path/to/file/goeshere.csv"  # Path to the CSV file
+output_format = None  # None goes by csv_file_path's suffix: .csv, .ndjson(.gz/.zst), .parquet or .arrow
+use_cache = False  # Sync issues into a local SQLite store and report from it
+cache_path = "issues.db"
+cache_since = "2024-01-01"  # Oldest creation date kept in the local store
+http_cache_path = None  # e.g. "http_cache.db" to revalidate issues and notes with ETags between runs
+exclude_labels = ["exclude_label"]  # Issues with any of these labels are left out of the report
+include_first_response = False  # Also scan notes for time-to-first-response (one request per issue)
+max_workers = 8  # Notes scans run in parallel when include_first_response is on
+journal_path = "gitlab_export.journal"  # Progress log that --resume continues from
+log_level = "INFO"  # DEBUG lists every issue, WARNING keeps the run quiet
+log_json = False  # Emit one JSON object per log line instead of plain text
+metrics_path = None  # e.g. "metrics.json", or "metrics.prom" for the Prometheus textfile collector
+profile = None  # "cprofile" or "tracemalloc" to print where time or memory goes
 
-# Function to fetch all issues with optional filters
-def get_issues(state=None, include_labels=None):
+class JsonFormatter(logging.Formatter):
+    """ Format log records as single-line JSON for log shippers """
+    def format(self, record):
+        return json.dumps({"time": self.formatTime(record), "level": record.levelname,
+                           "message": record.getMessage()})
+
+handler = logging.StreamHandler()
+handler.setFormatter(JsonFormatter() if log_json else logging.Formatter("%(message)s"))
+log = logging.getLogger("gitlab_export")
+log.addHandler(handler)
+log.setLevel(log_level)
+
+SUMMARY_COLUMNS = [Column("statistic", header="Statistic"), Column("value", "float", header="Value")]
+# Durations in days; follows the summary in CSV, goes to a sibling ".breakdown" file otherwise
+BREAKDOWN_COLUMNS = [
+    Column("breakdown", header="Breakdown"),
+    Column("metric", header="Metric"),
+    Column("group", header="Group"),
+    Column("count", "int", header="Count"),
+    Column("mean", "float", header="Mean")
+] + [Column(f"p{p}", "float", header=f"P{p}") for p in PERCENTILES]
+
+client = GitLabClient(api_url, access_token, cache=HttpCache(http_cache_path) if http_cache_path else None)
+cache = IssueCache(cache_path) if use_cache else None
+
+# Function to fetch all issues with optional filters, applied by GitLab itself
+# columns, an IssueColumns, is filled as pages arrive so the statistics don't walk the records again
+def get_issues(state=None, include_labels=None, exclude_labels=exclude_labels, assignee_id=None, journal=None,
+               columns=None):
     params = {
-        "private_token": access_token,
+        "created_after": created_after,
+        "created_before": created_before,
         "per_page": 100
     }
     if state:
         params["state"] = state
     if include_labels:
         params["labels"] = ','.join(include_labels)
-    
-    exclude_label = "exclude_label"
-    issues = []
-    page = 1
-
-    while True:
-        params["page"] = page
-        response = requests.get(base_url, params=params)
-        print(f"Fetching page {page}: {response.url}")  # Debug: Show request URL
-        if response.status_code != 200:
-            print(f"Failed to fetch issues: {response.status_code}")
-            break
-        data = response.json()
-        if not data:
-            break  # No more data to process
-
-        filtered_data = []
-        for issue in data:
-            issue_labels = issue.get('labels', [])  # Assume labels are a list of strings
-            print(f"Issue ID {issue['id']} Labels: {issue_labels}")  # Debug: Print labels of each issue
-
-            # Exclude issues that contain the 'Deployment-Passport' label
-            if exclude_label not in issue_labels:
-                filtered_data.append(issue)
-
-        issues.extend(filtered_data)
-        page += 1
-    
+    if exclude_labels:
+        params["not[labels]"] = ','.join(exclude_labels)
+    if assignee_id:
+        params["assignee_id"] = assignee_id
+
+    # Issues an interrupted run already fetched
+    issues = [IssueRecord.from_list(row) for row in journal.rows] if journal else []
+    if columns is not None:
+        columns.extend(issues)
+
+    if use_cache:
+        cache.sync(client, issues_path, {"created_after": cache_since})
+        pages = [(list(cache.issues(issues_path, created_after, created_before, state, include_labels,
+                                    exclude_labels, assignee_id)), None)]
+    else:
+        resume = journal.checkpoint if journal else None
+        pages = client.iter_pages_resumable(issues_path, params, keyset=True, resume=resume)
+
+    for page, (data, token) in enumerate(pages, start=1):
+        log.info("Fetched page %d: %d issues", page, len(data))
+        if log.isEnabledFor(logging.DEBUG):
+            for issue in data:
+                log.debug("Issue ID %s Labels: %s", issue['id'], issue.get('labels', []))
+        with metrics.stage("transform"):
+            records = [IssueRecord.from_json(issue) for issue in data]
+            if columns is not None:
+                columns.extend(records)
+        issues.extend(records)
+        if journal:
+            for record in records:
+                journal.record(record.as_list())
+            if token:
+                journal.mark(token)
+
     return issues
 
+def get_first_response(issue):
+    note = client.first_public_note(issue.project_id, issue.iid)
+    return parse_iso(note['created_at']) if note else None
+
+# Function to look up when each issue first got a public reply
+def get_first_responses(issues):
+    first_responses = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(issue, executor.submit(get_first_response, issue)) for issue in issues]
+        for issue, future in futures:
+            try:
+                first_response = future.result()
+            except Exception as e:  # Network errors and malformed payloads alike only cost this issue its time
+                log.warning("Could not get the first response for issue %s: %r", issue.iid, e)
+                continue
+            if first_response is not None:
+                first_responses[issue.id] = first_response
+    return first_responses
+
 # Function to process issues data
-def process_data(issues):
-    opened_count = len(issues)
-    closed_count = 0
-    total_closure_time = 0
-    
-    for issue in issues:
-        if issue["state"] == "closed":
-            closed_count += 1
-            created_at = datetime.fromisoformat(issue['created_at'].rstrip('Z'))
-            closed_at = datetime.fromisoformat(issue['closed_at'].rstrip('Z'))
-            closure_time_seconds = (closed_at - created_at).total_seconds()
-            total_closure_time += closure_time_seconds
-
-    # Calculate average closure time in days
-    avg_closure_days = (total_closure_time / closed_count) / 86400 if closed_count > 0 else 0
-    
-    return opened_count, closed_count, avg_closure_days
-
-# Output to CSV
-def output_to_csv(opened, closed, avg_closure_days):
-    with open(csv_file_path, 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Statistic", "Value"])
-        writer.writerow(["Opened Tickets", opened])
-        writer.writerow(["Closed Tickets", closed])
-        writer.writerow(["Average Closure Time (days)", avg_closure_days])
-
-# Fetching and processing the issues
-issues = get_issues()
-opened, closed, avg_closure = process_data(issues)
-
-# Outputting the results to CSV
-output_to_csv(opened, closed, avg_closure)
-print(f"Statistics written to /Path/Goes/Here")
\ No newline at end of file
+def process_data(issues, first_responses=None):
+    with metrics.stage("transform"):
+        return compute_stats(issues, first_responses)
+
+def summary_row(name, summary):
+    return [name, summary["count"], summary["mean"]] + [summary[f"p{p}"] for p in PERCENTILES]
+
+# Output to CSV, or whichever format output_format names
+def write_output(stats):
+    with metrics.stage("write"), open_sink(csv_file_path, SUMMARY_COLUMNS, output_format) as sink:
+        sink.write(["Opened Tickets", stats["opened"]])
+        sink.write(["Closed Tickets", stats["closed"]])
+        sink.write(["Average Closure Time (days)", stats["closure"]["mean"] or 0])
+
+        # Distribution of closure and first-response times, overall and per group (days)
+        with sink.table("breakdown", BREAKDOWN_COLUMNS) as table:
+            for metric in ("closure", "first_response"):
+                table.write(["all", metric] + summary_row("all", stats[metric]))
+            for by in BREAKDOWNS:
+                for metric in ("closure", "first_response"):
+                    for group, summary in stats["breakdowns"][(by, metric)].items():
+                        table.write([by, metric] + summary_row(group, summary))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export GitLab issue statistics to CSV")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export from its journal")
+    args = parser.parse_args()
+
+    # Fetching and processing the issues
+    journal = ExportJournal(journal_path, resume=args.resume)
+    try:
+        with profiling(profile):
+            try:
+                columns = IssueColumns()
+                issues = get_issues(journal=journal, columns=columns)
+                first_responses = get_first_responses(issues) if include_first_response else None
+            except requests.exceptions.RequestException as e:
+                journal.close()
+                log.error("Export interrupted: %s. Progress is saved, rerun with --resume to continue.", e)
+                sys.exit(1)
+            journal.close(remove=True)
+            stats = process_data(columns, first_responses)
+
+            # Outputting the results
+            write_output(stats)
+    finally:
+        if metrics_path:
+            metrics.write(metrics_path, job="gitlab_export")
+    log.info("Statistics written to %s", csv_file_path)
@@ -0,0 +1,149 @@
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_HTTP_CACHE_PATH = "http_cache.db"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # Least recently used responses are dropped past this size
+TOUCH_BATCH = 256  # Cache hits whose last_used update is written together
+KEPT_HEADERS = ("Content-Type", "Link", "X-Page", "X-Next-Page", "X-Per-Page", "X-Total", "X-Total-Pages")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT,
+    body BLOB,
+    size INTEGER,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class CacheEntry:
+    __slots__ = ("etag", "last_modified", "headers", "body")
+
+    def __init__(self, etag, last_modified, headers, body):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    def validators(self):
+        """ Conditional request headers for revalidating this entry """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """ Persistent ETag/Last-Modified response cache with LRU eviction by total size """
+
+    def __init__(self, path=DEFAULT_HTTP_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()  # One connection shared by the client's worker threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.touched = {}  # key -> last_used for hits not yet written
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.evict()  # In case max_bytes shrank since the last run
+        self.conn.commit()
+        atexit.register(self.flush)  # The scripts never close the cache themselves
+
+    @staticmethod
+    def key(url, params=None, token=None):
+        """ Cache key for a URL, its query parameters (in any order) and the token it was fetched with
+
+        Tokens can see different things, so each gets its own entries; only
+        a hash of the token is stored.
+        """
+        key = url if not params else f"{url}?{urlencode(sorted(params.items()))}"
+        if token:
+            key = hashlib.sha256(token.encode()).hexdigest()[:16] + " " + key
+        return key
+
+    def lookup(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT etag, last_modified, headers, body FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None:
+                return None
+            # last_used only orders eviction, so hits are written in batches instead of a commit each
+            self.touched[key] = time.time()
+            if len(self.touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self.conn.commit()
+        return CacheEntry(row[0], row[1], json.loads(row[2]), row[3])
+
+    def _write_touched(self):
+        """ Write batched last_used times; call with the lock held """
+        if self.touched:
+            self.conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                  [(used, key) for key, used in self.touched.items()])
+            self.touched.clear()
+
+    def flush(self):
+        """ Write out pending last_used times """
+        with self.lock:
+            self._write_touched()
+            self.conn.commit()
+
+    def store(self, key, response):
+        """ Keep a 200 response if the server gave it a validator """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        body = response.content
+        with self.lock:
+            self.touched.pop(key, None)
+            self._write_touched()  # Eviction goes by last_used, so it has to be current
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (key, etag, last_modified, json.dumps(headers), body, len(body), time.time()))
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        """ Drop least recently used entries until the cache fits in max_bytes; call with the lock held """
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    @staticmethod
+    def replay(entry, response):
+        """ Turn a 304 into the cached 200 response it confirms """
+        cached = requests.Response()
+        cached.status_code = 200
+        cached._content = entry.body
+        cached.headers = CaseInsensitiveDict(entry.headers)
+        cached.url = response.url
+        cached.request = response.request
+        cached.encoding = "utf-8"
+        return cached
+
+    def close(self):
+        atexit.unregister(self.flush)
+        with self.lock:
+            self._write_touched()
+            self.conn.commit()
+            self.conn.close()
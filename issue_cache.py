@@ -0,0 +1,98 @@
+import json
+import sqlite3
+
+DEFAULT_CACHE_PATH = "issues.db"  # Local SQLite copy of synced issues
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    project_id INTEGER,
+    iid INTEGER,
+    state TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    labels TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issues_scope_created ON issues (scope, created_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    last_updated_at TEXT
+);
+"""
+
+
+class IssueCache:
+    """ On-disk issue store kept current with updated_after delta syncs """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def last_synced(self, scope):
+        row = self.conn.execute("SELECT last_updated_at FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, client, path, params=None):
+        """ Pull issues changed since the last sync of this path into the store
+
+        The first sync downloads everything matching params; later syncs only
+        ask for issues with updated_after set to the newest updated_at already
+        stored, so the server's clock decides what counts as changed.
+        """
+        params = dict(params or {})
+        params["scope"] = "all"
+        last = self.last_synced(path)
+        if last:
+            params["updated_after"] = last
+
+        count = 0
+        newest = last
+        for page in client.iter_pages(path, params, keyset=True):
+            rows = []
+            for issue in page:
+                rows.append((issue['id'], path, issue.get('project_id'), issue.get('iid'), issue.get('state'),
+                             issue.get('created_at'), issue.get('updated_at'),
+                             json.dumps(issue.get('labels', [])), json.dumps(issue)))
+                if issue.get('updated_at') and (newest is None or issue['updated_at'] > newest):
+                    newest = issue['updated_at']
+            self.conn.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            count += len(rows)
+
+        self.conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (path, newest))
+        self.conn.commit()
+        print(f"Synced {count} changed issues for {path}")
+        return count
+
+    def issues(self, path, created_after=None, created_before=None, state=None,
+               labels=None, exclude_labels=None, assignee_id=None):
+        """ Yield stored issues for a path, oldest first, matching the given filters """
+        query = "SELECT labels, data FROM issues WHERE scope = ?"
+        args = [path]
+        if created_after:
+            query += " AND created_at >= ?"
+            args.append(created_after)
+        if created_before:
+            query += " AND created_at < ?"
+            args.append(created_before)
+        if state:
+            query += " AND state = ?"
+            args.append(state)
+        query += " ORDER BY created_at, id"
+
+        labels = set(labels or [])
+        exclude_labels = set(exclude_labels or [])
+        assignee_id = int(assignee_id) if assignee_id else None  # Config and CLI values may be strings
+        for issue_labels, data in self.conn.execute(query, args):
+            if labels or exclude_labels:
+                issue_labels = set(json.loads(issue_labels))
+                if not labels <= issue_labels or exclude_labels & issue_labels:
+                    continue
+            issue = json.loads(data)
+            if assignee_id and assignee_id not in {a['id'] for a in issue.get('assignees') or []}:
+                continue
+            yield issue
+
+    def close(self):
+        self.conn.close()
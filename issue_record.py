@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=4096)
+def _day_ms(day):
+    """ Epoch milliseconds at midnight UTC of a YYYY-MM-DD date, cached since exports repeat dates a lot """
+    return (datetime(int(day[0:4]), int(day[5:7]), int(day[8:10])) - EPOCH) // timedelta(milliseconds=1)
+
+
+def parse_iso(value):
+    """ Parse a GitLab ISO-8601 timestamp into epoch milliseconds (UTC), None stays None
+
+    Handles the shapes GitLab returns (2024-05-01T12:34:56.789Z, without
+    fractional seconds, or with a +HH:MM offset) by slicing, and falls back
+    to datetime.fromisoformat for anything else.
+    """
+    if not value:
+        return None
+    if len(value) < 20 or value[10] != 'T':
+        return _parse_iso_slow(value)
+
+    ms = _day_ms(value[:10]) + int(value[11:13]) * 3600000 + int(value[14:16]) * 60000 + int(value[17:19]) * 1000
+    rest = value[19:]
+    if rest[:1] == '.':
+        digits = 1
+        while digits < len(rest) and rest[digits].isdigit():
+            digits += 1
+        ms += int(rest[1:digits].ljust(3, '0')[:3])
+        rest = rest[digits:]
+
+    if rest == 'Z':
+        return ms
+    if len(rest) == 6 and rest[0] in '+-' and rest[3] == ':':
+        offset = int(rest[1:3]) * 3600000 + int(rest[4:6]) * 60000
+        return ms - offset if rest[0] == '+' else ms + offset
+    return _parse_iso_slow(value)
+
+
+def _parse_iso_slow(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH.replace(tzinfo=timezone.utc)) // timedelta(milliseconds=1)
+
+
+def format_iso(ms):
+    """ Format epoch milliseconds the way the exporters always have: 2024-05-01T12:34:56.789000Z """
+    return (EPOCH + timedelta(milliseconds=ms)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class IssueRecord:
+    """ The handful of issue fields the exporters use, with timestamps as epoch milliseconds """
+
+    __slots__ = ("id", "iid", "project_id", "title", "state", "labels", "created_at", "updated_at",
+                 "closed_at", "assignee_id", "assignee_name", "time_spent", "merge_request_urls")
+
+    def __init__(self, id=None, iid=None, project_id=None, title="", state=None, labels=(), created_at=None,
+                 updated_at=None, closed_at=None, assignee_id=None, assignee_name=None, time_spent=0,
+                 merge_request_urls=()):
+        self.id = id
+        self.iid = iid
+        self.project_id = project_id
+        self.title = title
+        self.state = state
+        self.labels = labels
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.closed_at = closed_at
+        self.assignee_id = assignee_id
+        self.assignee_name = assignee_name
+        self.time_spent = time_spent
+        self.merge_request_urls = merge_request_urls
+
+    @classmethod
+    def from_json(cls, issue):
+        """ Build a record from a REST issue dict, keeping nothing else from it """
+        assignee = issue.get('assignee')
+        return cls(
+            id=issue.get('id'),
+            iid=issue.get('iid'),
+            project_id=issue.get('project_id'),
+            title=issue.get('title', ""),
+            state=issue.get('state'),
+            labels=tuple(issue.get('labels', ())),
+            created_at=parse_iso(issue.get('created_at')),
+            updated_at=parse_iso(issue.get('updated_at')),
+            closed_at=parse_iso(issue.get('closed_at')),
+            assignee_id=assignee['id'] if assignee else None,
+            assignee_name=assignee['name'] if assignee else None,
+            time_spent=(issue.get('time_stats') or {}).get('total_time_spent'),  # None when GitLab sent no time stats
+            merge_request_urls=tuple(mr['web_url'] for mr in (issue.get('references') or {}).get('merge_requests', []))
+        )
+
+    def as_list(self):
+        """ Field values in __slots__ order, for journals and other JSON storage """
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        record = cls(*values)
+        record.labels = tuple(record.labels)
+        record.merge_request_urls = tuple(record.merge_request_urls)
+        return record
+
+    def __repr__(self):
+        return f"IssueRecord(id={self.id}, project_id={self.project_id}, iid={self.iid})"
+
@@ -0,0 +1,231 @@
+from itertools import chain, repeat
+from operator import attrgetter
+
+import numpy as np
+
+PERCENTILES = (50, 90, 95, 99)
+BREAKDOWNS = ("label", "assignee", "project", "week")
+SUMMARY_KEYS = ("count", "mean") + tuple(f"p{p}" for p in PERCENTILES)
+COLUMN_TYPES = {
+    "ids": np.int64,
+    "created": np.float64,  # Epoch ms as floats so missing ends can be NaN
+    "closed": np.float64,
+    "projects": np.int64,
+    "assignees": np.int64,
+    "label_codes": np.int64,
+    "label_rows": np.int64
+}
+
+
+def durations(end, start):
+    """ Seconds between two epoch-millisecond arrays, NaN where the end is missing """
+    return (end - start) / 1000
+
+
+def week_starts(created):
+    """ Monday of the week each timestamp falls in (numpy weeks start on Thursday, the epoch's weekday) """
+    shift = np.timedelta64(3, "D")
+    return ((created + shift).astype("datetime64[W]") - shift).astype("datetime64[D]")
+
+
+def dense_codes(values):
+    """ np.unique(values, return_inverse=True) for integers spanning a short range, counting instead of sorting """
+    if not values.size:
+        return values, values
+    low = values.min()
+    present = np.bincount(values - low) > 0
+    return np.flatnonzero(present) + low, (np.cumsum(present) - 1)[values - low]
+
+
+def encode(values, names):
+    """ Integer codes for values, adding the ones not seen before to names (value -> code) """
+    # len(names) is taken before setdefault runs for the same value, so a new value gets the next code
+    return np.fromiter(map(names.setdefault, values, map(len, repeat(names))), np.int64)
+
+
+class IssueColumns:
+    """ The issue fields the statistics need, as NumPy columns filled a page at a time
+
+    extend() takes each field out of a batch of records with one np.fromiter,
+    so an exporter can build the columns as pages arrive and compute_stats()
+    starts from arrays instead of walking every record again. Assignees and
+    labels are integer codes with a name per code; labels are exploded into
+    (label, row) pairs since an issue can carry several.
+    """
+
+    def __init__(self, issues=()):
+        self.chunks = {name: [] for name in COLUMN_TYPES}
+        self.assignee_names = {}  # Name -> integer code
+        self.label_names = {}
+        self.rows = 0
+        self.extend(issues)
+
+    def __len__(self):
+        return self.rows
+
+    def extend(self, issues):
+        issues = issues if isinstance(issues, list) else list(issues)
+        count = len(issues)
+        if not count:
+            return
+
+        def field(name):
+            return map(attrgetter(name), issues)
+
+        closed = np.fromiter(field("closed_at"), np.float64, count)
+        # Reopened issues keep their old closed_at
+        closed[np.fromiter(map("closed".__ne__, field("state")), bool, count)] = np.nan
+        lengths = np.fromiter(map(len, field("labels")), np.int64, count)
+        for name, chunk in (
+            ("ids", np.fromiter(field("id"), np.int64, count)),
+            ("created", np.fromiter(field("created_at"), np.float64, count)),
+            ("closed", closed),
+            ("projects", np.fromiter((project or 0 for project in field("project_id")), np.int64, count)),
+            ("assignees", encode((name or "Unassigned" for name in field("assignee_name")), self.assignee_names)),
+            ("label_codes", encode(chain.from_iterable(field("labels")), self.label_names)),
+            ("label_rows", np.repeat(np.arange(self.rows, self.rows + count), lengths))
+        ):
+            self.chunks[name].append(chunk)
+        self.rows += count
+
+    def column(self, name):
+        chunks = self.chunks[name]
+        if len(chunks) != 1:
+            chunks[:] = [np.concatenate(chunks) if chunks else np.empty(0, COLUMN_TYPES[name])]  # Joined once
+        return chunks[0]
+
+    def responded(self, first_responses):
+        """ Epoch ms of each row's first public note from an issue id -> ms mapping, NaN where it has none """
+        if not first_responses:
+            return np.full(self.rows, np.nan)
+        ids = self.column("ids")
+        keys = np.fromiter(first_responses.keys(), np.int64, len(first_responses))
+        values = np.fromiter(first_responses.values(), np.float64, len(first_responses))
+        order = np.argsort(keys)
+        keys, values = keys[order], values[order]
+        positions = np.minimum(np.searchsorted(keys, ids), keys.size - 1)
+        return np.where(keys[positions] == ids, values[positions], np.nan)
+
+
+def load_columns(issues, first_responses=None):
+    """ The arrays the statistics run on, from an IssueColumns or any iterable of issue records
+
+    first_responses optionally maps issue id to the epoch milliseconds of its
+    first public note. Grouping columns are integer codes with a name list
+    per column.
+    """
+    columns = issues if isinstance(issues, IssueColumns) else IssueColumns(issues)
+    created = columns.column("created")
+    weeks = week_starts(created.astype(np.int64).astype("datetime64[ms]")).astype(np.int64)  # Days since the epoch
+    week_codes, week_inverse = dense_codes(weeks)
+    project_codes, project_inverse = np.unique(columns.column("projects"), return_inverse=True)
+    names = {
+        "assignee": list(columns.assignee_names),
+        "project": project_codes.tolist(),
+        "week": week_codes.astype("datetime64[D]").astype(str).tolist(),
+        "label": list(columns.label_names)
+    }
+    rows = {
+        "assignee": columns.column("assignees"),
+        "project": project_inverse.reshape(-1),
+        "week": week_inverse,
+        "label": columns.column("label_codes")
+    }
+    return {
+        "created": created,
+        "closure": durations(columns.column("closed"), created),  # Seconds, NaN while open
+        "first_response": durations(columns.responded(first_responses), created),  # Seconds, NaN without a reply
+        # Codes in the smallest unsigned type that holds them, which the grouping sort handles by radix
+        "rows": {by: codes.astype(np.min_scalar_type(max(len(names[by]) - 1, 0))) for by, codes in rows.items()},
+        "names": names,
+        "label_rows": columns.column("label_rows")
+    }
+
+
+def ranked(seconds):
+    """ Positions of the durations that are not NaN, shortest first, and those durations in days """
+    rows = np.flatnonzero(~np.isnan(seconds))
+    rows = rows[np.argsort(seconds[rows])]
+    return rows, seconds[rows] / 86400
+
+
+def summarize_groups(days, codes, groups):
+    """ Count, mean and percentiles of ascending durations in days per integer group code
+
+    A stable sort on the codes leaves each group's durations as one ascending
+    run, so the percentiles of every group come out of the same few array
+    operations instead of a np.percentile call each. They interpolate
+    linearly, like np.percentile.
+    """
+    counts = np.bincount(codes, minlength=groups)
+    means = np.bincount(codes, weights=days, minlength=groups) / np.maximum(counts, 1)
+    days = days[np.argsort(codes, kind="stable")]  # Radix sort, the codes being small unsigned ints
+    columns = [counts.tolist(), means.tolist()]
+    starts = np.cumsum(counts) - counts
+    last = np.maximum(counts - 1, 0)
+    end = max(days.size - 1, 0)
+    if not days.size:
+        days = np.full(1, np.nan)
+    for p in PERCENTILES:
+        position = last * (p / 100)
+        below = np.floor(position).astype(np.int64)
+        fraction = position - below
+        # Empty groups read a neighbour here; their summaries are blanked below
+        low = days[np.minimum(starts + below, end)]
+        high = days[np.minimum(starts + np.minimum(below + 1, last), end)]
+        difference = high - low
+        # The same two-sided interpolation as np.percentile, exact at both ends
+        values = np.where(fraction >= 0.5, high - difference * (1 - fraction), low + difference * fraction)
+        columns.append(values.tolist())
+
+    summaries = []
+    for values in zip(*columns):
+        summary = dict(zip(SUMMARY_KEYS, values))
+        if not summary["count"]:
+            summary.update(dict.fromkeys(SUMMARY_KEYS[1:]))
+        summaries.append(summary)
+    return summaries
+
+
+def summarize(seconds, ranks=None):
+    """ Count, mean and percentiles in days for one array of durations, ignoring NaN """
+    _, days = ranks or ranked(seconds)
+    return summarize_groups(days, np.zeros(days.size, np.uint8), 1)[0]
+
+
+def breakdown(columns, metric, by, ranks=None):
+    """ Summarize a duration column per value of a grouping column; ranks is ranked() of those values """
+    values = columns[metric]
+    if by == "label":
+        values = values[columns["label_rows"]]
+
+    names = columns["names"][by]
+    if not names:
+        return {}
+    rows, days = ranks or ranked(values)
+    return dict(zip(names, summarize_groups(days, columns["rows"][by][rows], len(names))))
+
+
+def compute_stats(issues, first_responses=None):
+    """ Overall and per-label/assignee/project/week closure and first-response statistics
+
+    issues is an IssueColumns or any iterable of issue records. Each metric
+    is sorted once for the row groupings and once for the exploded labels.
+    """
+    columns = load_columns(issues, first_responses)
+    ranks = {}
+    for metric in ("closure", "first_response"):
+        ranks[metric] = ranked(columns[metric])
+        ranks[metric, "label"] = ranked(columns[metric][columns["label_rows"]])
+    stats = {
+        "opened": int(columns["created"].size),
+        "closed": int(ranks["closure"][0].size),
+        "closure": summarize(columns["closure"], ranks["closure"]),
+        "first_response": summarize(columns["first_response"], ranks["first_response"]),
+        "breakdowns": {}
+    }
+    for by in BREAKDOWNS:
+        for metric in ("closure", "first_response"):
+            metric_ranks = ranks[metric, "label"] if by == "label" else ranks[metric]
+            stats["breakdowns"][(by, metric)] = breakdown(columns, metric, by, metric_ranks)
+    return stats
@@ -0,0 +1,100 @@
+import json
+import mmap
+import os
+
+CHUNK_SIZE = 1 << 16  # Characters read at a time from a JSON array file
+LINE_FORMATS = ('.ndjson', '.jsonl')  # Suffixes read as one JSON value per line
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789+-.eE'
+
+# Where iter_json_array is inside the array
+OPEN, FIRST, VALUE, SEPARATOR, DONE = range(5)
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """ Yield the items of a JSON array one at a time, reading the file in chunks
+
+    Only the item being decoded and the rest of its chunk are held in
+    memory. Raises json.JSONDecodeError if the file is not exactly one JSON
+    array (missing or doubled commas, content after the closing bracket) or
+    stops part way through; items before the damage have already been
+    yielded.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    state = OPEN
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                if state == DONE:
+                    return
+                raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+            buffer, pos = file.read(chunk_size), 0
+            eof = not buffer
+            continue
+
+        char = buffer[pos]
+        if state == OPEN:
+            if char != '[':
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            state, pos = FIRST, pos + 1
+        elif state == SEPARATOR or (state == FIRST and char == ']'):
+            if char == ']':
+                state = DONE
+            elif char == ',' and state == SEPARATOR:
+                state = VALUE
+            else:
+                raise json.JSONDecodeError("Expecting ',' or ']'", buffer, pos)
+            pos += 1
+        elif state == DONE:
+            raise json.JSONDecodeError("Extra data after the array", buffer, pos)
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                more = "" if eof else file.read(chunk_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0  # The item straddles the chunk boundary
+                continue
+            if (isinstance(item, (int, float)) and not isinstance(item, bool) and not eof
+                    and not buffer[end:].strip(NUMBER_CHARS)):
+                # A number that runs to the end of the chunk may go on in the next one ("1" of "1.5")
+                more = file.read(chunk_size)
+                if more:
+                    buffer, pos = buffer[pos:] + more, 0
+                    continue
+                eof = True
+            yield item
+            state, pos = SEPARATOR, end
+
+
+def iter_ndjson(path):
+    """ Yield one JSON value per non-blank line, reading the file through a memory map """
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return  # An empty file can't be mapped
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for line in iter(data.readline, b''):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_records(path):
+    """ Stream the values of a .ndjson/.jsonl file or a JSON array, without loading it whole """
+    if path.endswith(LINE_FORMATS):
+        yield from iter_ndjson(path)
+        return
+    with open(path, 'r') as file:
+        yield from iter_json_array(file)
+
+
+def write_records(path, records):
+    """ Write records in the format iter_records reads back for path: one per line, or a JSON array """
+    with open(path, 'w') as file:
+        if path.endswith(LINE_FORMATS):
+            file.writelines(json.dumps(record) + '\n' for record in records)
+        else:
+            json.dump(list(records), file)
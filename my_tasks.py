@@ -1,23 +1,35 @@
-import json
 import sys
 from datetime import datetime, date, timedelta
+from task_store import TaskStore
+from task_loader import LazyTaskList
+from task_table import parse_iso_date
+from task_render import write_lines
 
 class Task:
-    def __init__(self, description, due_date=None, priority='Medium', status='In Progress'):
+    # No per-task __dict__; priority and status are interned so every task shares the same few strings
+    __slots__ = ('id', 'description', 'due_date', 'priority', 'status')
+
+    def __init__(self, description, due_date=None, priority='Medium', status='In Progress', id=None):
+        self.id = id  # Assigned by the store when the task is first saved
         self.description = description
         self.due_date = self.parse_due_date(due_date)
-        self.priority = priority
-        self.status = status
+        self.priority = sys.intern(priority) if priority is not None else None  # Older files may hold null
+        self.status = sys.intern(status) if status is not None else None
 
-    def parse_due_date(self, due_date):
+    @staticmethod
+    def parse_due_date(due_date):
         if isinstance(due_date, str):
+            parsed = parse_iso_date(due_date)  # Cached; saved files only hold YYYY-MM-DD dates
+            if parsed:
+                return parsed
             try:
                 return datetime.strptime(due_date, '%Y-%m-%d').date()
             except ValueError:
-                return self._parse_relative_date(due_date)
+                return Task._parse_relative_date(due_date)
         return due_date
 
-    def _parse_relative_date(self, due_date_str):
+    @staticmethod
+    def _parse_relative_date(due_date_str):
         today = datetime.now().date()
         due_date_str = due_date_str.lower().strip()
         if due_date_str == 'today':
@@ -32,12 +44,16 @@ class Task:
         return None
 
     def __str__(self):
-        return f"{self.description} (Due: {self.format_due_date()}, Priority: {self.priority}, Status: {self.status})"
+        return self.describe()
+
+    def describe(self, today=None):
+        """ The task as one line, with Today/Tomorrow worked out against the given date """
+        return f"{self.description} (Due: {self.format_due_date(today)}, Priority: {self.priority}, Status: {self.status})"
 
-    def format_due_date(self):
+    def format_due_date(self, today=None):
         if not self.due_date:
             return "No due date"
-        today = datetime.now().date()
+        today = today or datetime.now().date()
         if self.due_date == today:
             return "Today"
         elif self.due_date == today + timedelta(days=1):
@@ -45,11 +61,17 @@ class Task:
         else:
             return self.due_date.strftime("%Y-%m-%d")
 
-    def is_overdue(self):
-        return self.due_date and self.due_date < datetime.now().date()
-    
-    def due_within_one_day(self):
-        today = datetime.now().date()
+    def to_dict(self):
+        return {'description': self.description,
+                'due_date': self.due_date.strftime('%Y-%m-%d') if self.due_date else None,
+                'priority': self.priority,
+                'status': self.status}
+
+    def is_overdue(self, today=None):
+        return self.due_date and self.due_date < (today or datetime.now().date())
+
+    def due_within_one_day(self, today=None):
+        today = today or datetime.now().date()
         return self.due_date and (self.due_date - today).days <= 1
 
 def get_task_from_user():
@@ -75,6 +97,7 @@ def get_task_from_user():
 
 def add_task(description, due_date, priority, status):
     task = Task(description, due_date, priority, status)
+    store.add(task)
     tasks.append(task)
     print("Task added successfully!")
 
@@ -83,15 +106,14 @@ def remove_task():
         print("Your to-do list is empty.")
         return
 
-    print("Your to-do list:")
-    for index, task in enumerate(tasks, start=1):
-        print(f"{index}. {task}")
+    write_lines(["Your to-do list:"] + task_lines(tasks, date.today()))
 
     while True:
         try:
             task_index = int(input("Enter the number of the task you want to remove: ")) - 1
             if 0 <= task_index < len(tasks):
                 removed_task = tasks.pop(task_index)
+                store.remove(removed_task)
                 print(f"Task removed: {removed_task}")
                 break
             else:
@@ -104,9 +126,7 @@ def update_task_status():
         print("Your to-do list is empty.")
         return
 
-    print("Your to-do list:")
-    for index, task in enumerate(tasks, start=1):
-        print(f"{index}. {task}")
+    write_lines(["Your to-do list:"] + task_lines(tasks, date.today()))
 
     while True:
         try:
@@ -116,11 +136,13 @@ def update_task_status():
                 if new_status not in ["In Progress", "On Hold", "Complete"]:
                     print("Invalid status. Please try again.")
                     continue
-                tasks[task_index].status = new_status
+                tasks[task_index].status = sys.intern(new_status)
                 if new_status == "Complete":
                     archived_tasks.append(tasks.pop(task_index))
+                    store.archive(archived_tasks[-1])
                     print(f"Task archived: {archived_tasks[-1]}")
                 else:
+                    store.update(tasks[task_index])
                     print(f"Task updated: {tasks[task_index]}")
                 break
             else:
@@ -135,69 +157,89 @@ RESET = "\033[0m"
 def supports_color():
     return hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
 
+def task_lines(task_list, today):
+    """ Numbered lines for a list of tasks, all rendered against the same today """
+    return [f"{index}. {task.describe(today)}" for index, task in enumerate(task_list, start=1)]
+
 def display_tasks():
-    if tasks:
-        print("Your to-do list:")
-        for index, task in enumerate(tasks, start=1):
-            task_str = f"{index}. {task}"
-            if task.is_overdue():
-                if supports_color():
-                    print(f"{RED}{task_str} (OVERDUE){RESET}")
-                else:
-                    print(f"{task_str} (OVERDUE)")
-            elif task.due_within_one_day():
-                if supports_color():
-                    print(f"{YELLOW}{task_str} (DUE SOON){RESET}")
-                else:
-                    print(f"{task_str} (DUE SOON)")
-            else:
-                print(task_str)
-    else:
+    if not tasks:
         print("Your to-do list is empty.")
+        return
+
+    # One clock reading and one terminal check for the whole list, written out in one go
+    today = date.today()
+    color = supports_color()
+    # Range lookups on the due-date index instead of checking every task
+    overdue = {id(task) for task in tasks.overdue(today)}
+    due_soon = {id(task) for task in tasks.due_within(1, today)}
+    lines = ["Your to-do list:"]
+    for task, task_str in zip(tasks, task_lines(tasks, today)):
+        if id(task) in overdue:
+            lines.append(f"{RED}{task_str} (OVERDUE){RESET}" if color else f"{task_str} (OVERDUE)")
+        elif id(task) in due_soon:
+            lines.append(f"{YELLOW}{task_str} (DUE SOON){RESET}" if color else f"{task_str} (DUE SOON)")
+        else:
+            lines.append(task_str)
+    write_lines(lines)
 
 def display_archived_tasks():
     if archived_tasks:
-        print("Archived tasks:")
-        for index, task in enumerate(archived_tasks, start=1):
-            print(f"{index}. {task}")
+        write_lines(["Archived tasks:"] + task_lines(archived_tasks, date.today()))
     else:
         print("No archived tasks.")
 
+def display_by_priority():
+    if not tasks:
+        print("Your to-do list is empty.")
+        return
+    today = date.today()
+    write_lines(["Tasks by priority:"] + [f"- {task.describe(today)}" for task in tasks.by_priority_then_due()])
+
+def display_due_soon():
+    try:
+        days = int(input("Show tasks due within how many days? "))
+    except ValueError:
+        print("Please enter a valid number.")
+        return
+    today = date.today()
+    due_tasks = tasks.due_within(days, today)
+    if due_tasks:
+        write_lines([f"Tasks due in the next {days} day(s):"] + [f"- {task.describe(today)}" for task in due_tasks])
+    else:
+        print(f"Nothing due in the next {days} day(s).")
+
 def check_overdue_tasks():
-    overdue_tasks = [task for task in tasks if task.is_overdue()]
+    today = date.today()
+    overdue_tasks = tasks.overdue(today)
     if overdue_tasks:
-        print("\nOverdue tasks:")
-        for task in overdue_tasks:
-            print(f"{RED}- {task}{RESET}")
-        print()
-
-def save_tasks(tasks, filename='my_tasks.json'):
-    with open(filename, 'w') as file:
-        json.dump([{'description': task.description, 
-                    'due_date': task.due_date.strftime('%Y-%m-%d') if task.due_date else None, 
-                    'priority': task.priority,
-                    'status': task.status} for task in tasks], file)
-
-def load_tasks(filename='my_tasks.json'):
+        color = supports_color()
+        lines = [f"{RED}- {task.describe(today)}{RESET}" if color else f"- {task.describe(today)}" for task in overdue_tasks]
+        write_lines(["", "Overdue tasks:"] + lines + [""])
+
+def load_tasks(store):
+    """ Replay the store and split its tasks into (active, archived) """
     try:
-        with open(filename, 'r') as file:
-            tasks_data = json.load(file)
-            return [Task(**task) for task in tasks_data]
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        print('Error decoding JSON, returning empty task list. This may be caused by a corrupted file.')
-        return []
+        records = store.load()
+    except ValueError as e:
+        print(f'Error decoding JSON, starting from the journal alone. This may be caused by a corrupted file. ({e})')
+        records = store.load()
+    active, archived = [], []
+    for record in records:
+        if record.get('archived'):
+            archived.append(Task(**{key: value for key, value in record.items() if key != 'archived'}))
+        else:
+            active.append(record)
+    return LazyTaskList(active, Task), archived  # Active tasks are built from their records on first use
 
 def main():
-    global tasks, archived_tasks
-    tasks = load_tasks()  # Load tasks at the beginning
-    archived_tasks = []  # Initialize archived tasks list
+    global tasks, archived_tasks, store
+    store = TaskStore('my_tasks.json')  # Every change is journaled as it happens
+    tasks, archived_tasks = load_tasks(store)  # Load tasks at the beginning
     
     check_overdue_tasks()  # Check for overdue tasks when starting the program
     
     while True:
-        choice = input("Enter 'A' to add a task, 'R' to remove a task, 'U' to update task status, 'D' to display tasks, 'V' to view archived tasks, or 'Q' to quit: ").upper()
+        choice = input("Enter 'A' to add a task, 'R' to remove a task, 'U' to update task status, 'D' to display tasks, 'P' to display by priority, 'N' to see tasks due soon, 'V' to view archived tasks, or 'Q' to quit: ").upper()
         if choice == 'A':
             description, due_date, priority, status = get_task_from_user()
             add_task(description, due_date, priority, status)
@@ -207,10 +249,14 @@ def main():
             update_task_status()
         elif choice == 'D':
             display_tasks()
+        elif choice == 'P':
+            display_by_priority()
+        elif choice == 'N':
+            display_due_soon()
         elif choice == 'V':
             display_archived_tasks()
         elif choice == 'Q':
-            save_tasks(tasks)  # Save tasks before quitting
+            store.close()  # Flush the journal and fold it into my_tasks.json
             print("Tasks saved. Goodbye!")
             break
         else:
@@ -1,54 +1,169 @@
-import requests
-import csv
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from export_metrics import metrics, profiling
+from export_sinks import Column, open_sink
+from gitlab_client import GitLabClient
+from issue_cache import IssueCache
+from issue_record import IssueRecord
 
 # Configuration
-API_URL = "https://www.gitlab.com/api/v4?created_after=2024-04-01&created_before=2024-05-01"
+API_URL = "https://gitlab.com/api/v4"
 TOKEN = ""
-GROUP_ID = "XXX"
+GROUP_IDS = ["XXX"]  # Every group to include in the report
+DATE_WINDOWS = [("2024-04-01", "2024-05-01")]  # (created_after, created_before) ranges, split into months
+MAX_CONCURRENCY = 8  # (group, month) jobs fetched at once, each with one request in flight
+PAGE_BUFFER = 16  # Fetched pages waiting to be written before the jobs are held back
 CSV_FILE = "/Path/To/File/group_issues_details.csv"  # Name of the CSV file to export data
+OUTPUT_FORMAT = None  # None goes by CSV_FILE's suffix: .csv, .ndjson(.gz/.zst), .parquet or .arrow
+FLUSH_EVERY = 100  # Rows per write batch; CSV and NDJSON output is flushed after each
+USE_CACHE = False  # Sync issues into a local SQLite store and report from it
+CACHE_PATH = "issues.db"
+CACHE_SINCE = "2024-01-01"  # Oldest creation date kept in the local store
+METRICS_PATH = None  # e.g. "metrics.json", or "metrics.prom" for the Prometheus textfile collector
+PROFILE = None  # "cprofile" or "tracemalloc" to print where time or memory goes
 
-# Headers for authentication
-headers = {
-    "Authorization": f"Bearer {TOKEN}"
-}
-
-def fetch_issues_from_group(group):
-    """ Fetch all issues from given project with pagination """
-    all_issues = []
-    for group in group:
-        page = 1
-        while True:
-            response = requests.get(f"{API_URL}/groups/{GROUP_ID}/issues?page={page}&per_page=100", headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                if not data:
-                    break
-                all_issues.extend(data)
-                page += 1
+OUTPUT_COLUMNS = [
+    Column("project_id", "int", header="Project ID"),
+    Column("issue_id", "int", header="Issue ID"),
+    Column("assignee", header="Assignee"),
+    Column("time_spent_seconds", "int", header="Total Time Spent (s)"),
+    Column("time_spent", "duration", header="Time Spent (hr:min)", unit="s",
+           text=lambda seconds: f"{seconds // 3600}h:{(seconds % 3600) // 60}m"),
+    Column("references", header="References")
+]
+
+client = GitLabClient(API_URL, TOKEN, pool_size=MAX_CONCURRENCY)
+cache = IssueCache(CACHE_PATH) if USE_CACHE else None
+
+def month_windows(created_after, created_before):
+    """ Split a YYYY-MM-DD date range into calendar-month (start, end) pairs """
+    start = date.fromisoformat(created_after)
+    end = date.fromisoformat(created_before)
+    while start < end:
+        next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+        yield start.isoformat(), min(next_month, end).isoformat()
+        start = next_month
+
+def build_jobs(groups, windows):
+    """ One (group, created_after, created_before) job per group and month, without repeats """
+    jobs, seen = [], set()
+    for group in groups:
+        for created_after, created_before in windows:
+            for job in ((group,) + month for month in month_windows(created_after, created_before)):
+                if job not in seen:
+                    seen.add(job)
+                    jobs.append(job)
+    return jobs
+
+def fetch_issues_from_group(group, created_after, created_before):
+    """ Yield one group's issues created in a date window as compact records, one page at a time """
+    path = f"groups/{group}/issues"
+    if USE_CACHE:
+        yield map(IssueRecord.from_json, cache.issues(path, created_after, created_before))
+        return
+
+    params = {
+        "created_after": created_after,
+        "created_before": created_before,
+        "per_page": 100
+    }
+    count = 0
+    for data in client.iter_pages(path, params, workers=1):  # Raises once retries are exhausted
+        with metrics.stage("transform"):
+            page = [IssueRecord.from_json(issue) for issue in data]
+        count += len(page)
+        yield page
+    print(f"Fetched {count} issues for group {group} from {created_after} to {created_before}")
+
+def run_job(job, pages, stop):
+    """ Put one job's pages on the shared queue, then None when it is done or the error that ended it """
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False  # The reader has gone away
+
+    try:
+        for page in fetch_issues_from_group(*job):
+            if not put(page):
+                return
+    except Exception as e:
+        put(e)
+    else:
+        put(None)
+
+def iter_job_pages(jobs):
+    """ Yield pages from every job as they arrive, with at most MAX_CONCURRENCY jobs running at once
+
+    The queue holds PAGE_BUFFER pages, so a slow writer holds the fetching
+    jobs back instead of letting their issues pile up in memory.
+    """
+    pages = queue.Queue(maxsize=PAGE_BUFFER)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+    try:
+        for job in jobs:
+            executor.submit(run_job, job, pages, stop)
+        remaining = len(jobs)
+        while remaining:
+            page = pages.get()
+            if page is None:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
             else:
-                print(f"Failed to fetch issues for group {GROUP_ID}: {response.status_code}")
-                break
-    return all_issues
-
-def write_to_csv(issues):
-    """ Write issues data to a CSV file """
-    with open(CSV_FILE, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        # Write headers
-        writer.writerow(['Project ID', 'Issue ID', 'Assignee', 'Total Time Spent (s)', 'Time Spent (hr:min)', 'References'])
-        # Write issue data
+                yield page
+    finally:
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+
+def unique_issues(pages):
+    """ Flatten pages of issues, dropping issues created exactly on a month boundary that show up twice """
+    seen = set()
+    for issues in pages:
         for issue in issues:
-            time_spent_seconds = issue.get('time_stats', {}).get('total_time_spent', 0)
-            time_spent_hr_min = f"{time_spent_seconds // 3600}h:{(time_spent_seconds % 3600) // 60}m"
-            references = ", ".join([mr['web_url'] for mr in issue.get('references', {}).get('merge_requests', [])])
-            assignee_name = issue['assignee']['name'] if issue['assignee'] else 'Unassigned'
-            writer.writerow([issue['project_id'], issue['id'], assignee_name, time_spent_seconds, time_spent_hr_min, references])
+            if issue.id not in seen:
+                seen.add(issue.id)
+                yield issue
+
+def fetch_issues_from_groups(groups, windows):
+    """ Fetch every (group, month) job concurrently and yield the merged issues as their pages arrive """
+    jobs = build_jobs(groups, windows)
+    if USE_CACHE:
+        # SQLite connections stay on one thread, so sync and read the local store here
+        for group in groups:
+            cache.sync(client, f"groups/{group}/issues", {"created_after": CACHE_SINCE})
+        yield from unique_issues(page for job in jobs for page in fetch_issues_from_group(*job))
+        return
+
+    yield from unique_issues(iter_job_pages(jobs))
+
+def write_output(issues):
+    """ Write issues data to a CSV file, or whichever format OUTPUT_FORMAT names """
+    with open_sink(CSV_FILE, OUTPUT_COLUMNS, OUTPUT_FORMAT, FLUSH_EVERY) as sink:
+        # Write issue data as it streams in
+        for issue in issues:
+            with metrics.stage("write"):
+                references = ", ".join(issue.merge_request_urls)
+                assignee_name = issue.assignee_name or 'Unassigned'
+                time_spent = issue.time_spent or 0  # No time stats counts as none logged
+                sink.write([issue.project_id, issue.id, assignee_name, time_spent, time_spent, references])
 
 def main():
-    all_issues = fetch_issues_from_group(GROUP_ID)
-    
-    # Export to CSV
-    write_to_csv(all_issues)
+    try:
+        with profiling(PROFILE):
+            all_issues = fetch_issues_from_groups(GROUP_IDS, DATE_WINDOWS)
+
+            # Export, rows are written as pages arrive
+            write_output(all_issues)
+    finally:
+        if METRICS_PATH:
+            metrics.write(METRICS_PATH, job="new_time")
     print(f"Data has been exported to {CSV_FILE}")
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from itertools import count
+
+PRIORITY_RANK = {'High': 0, 'Medium': 1, 'Low': 2}
+NO_DUE_DATE = date.max.toordinal() + 1  # Sorts tasks without a due date after every dated one
+
+
+def index_keys(handle, due, priority):
+    """ (due key or None, priority key) for a task's due ordinal (or None) and priority name """
+    due_key = (due, handle) if due is not None else None
+    return due_key, (PRIORITY_RANK.get(priority, 1), NO_DUE_DATE if due is None else due, handle)
+
+
+class TaskList:
+    """ The to-do list in display order, with sorted indexes for date and priority queries
+
+    Behaves like the plain list the scripts used (append, pop, indexing,
+    iteration), and also keeps every task in two sorted lists: by due date,
+    and by priority then due date. Overdue, due-within-N-days and priority
+    views are bisect range lookups instead of scans. Call reindex() after
+    changing a task's due date or priority in place.
+
+    Tasks are tracked by integer handles, which also break ties in the
+    indexes; _task() turns a handle back into its Task.
+    """
+
+    def __init__(self, tasks=()):
+        self.handles = []  # Task handles in display order
+        self.objects = {}  # handle -> Task
+        self.handle_of = {}  # id(task) -> handle, for reindex()
+        self.by_due = []  # (due ordinal, handle) for tasks with a due date
+        self.by_priority = []  # (priority rank, due ordinal or NO_DUE_DATE, handle)
+        self.keys = {}  # handle -> (due key or None, priority key)
+        self.next_handle = count()
+        for task in tasks:
+            self.append(task)
+
+    def _task(self, handle):
+        return self.objects[handle]
+
+    def _keys(self, handle):
+        return self.keys.pop(handle)
+
+    def _index(self, handle, task):
+        due_key, priority_key = self.keys[handle] = index_keys(
+            handle, task.due_date.toordinal() if task.due_date else None, task.priority)
+        if due_key:
+            insort(self.by_due, due_key)
+        insort(self.by_priority, priority_key)
+
+    def _unindex(self, handle):
+        due_key, priority_key = self._keys(handle)
+        if due_key:
+            del self.by_due[bisect_left(self.by_due, due_key)]
+        del self.by_priority[bisect_left(self.by_priority, priority_key)]
+
+    def append(self, task):
+        handle = next(self.next_handle)
+        self.objects[handle] = task
+        self.handle_of[id(task)] = handle
+        self.handles.append(handle)
+        self._index(handle, task)
+
+    def pop(self, index=-1):
+        handle = self.handles[index]
+        task = self._task(handle)
+        del self.handles[index]
+        self._unindex(handle)
+        del self.objects[handle], self.handle_of[id(task)]
+        return task
+
+    def reindex(self, task):
+        handle = self.handle_of[id(task)]
+        self._unindex(handle)
+        self._index(handle, task)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._task(handle) for handle in self.handles[index]]
+        return self._task(self.handles[index])
+
+    def __iter__(self):
+        return (self._task(handle) for handle in self.handles)
+
+    def __len__(self):
+        return len(self.handles)
+
+    def overdue(self, today=None):
+        """ Tasks due before today, earliest first """
+        today = (today or date.today()).toordinal()
+        return [self._task(entry[-1]) for entry in self.by_due[:bisect_left(self.by_due, (today,))]]
+
+    def due_within(self, days, today=None):
+        """ Tasks due from today through today + days, earliest first """
+        today = (today or date.today()).toordinal()
+        start = bisect_left(self.by_due, (today,))
+        end = bisect_right(self.by_due, (today + days, float('inf')))
+        return [self._task(entry[-1]) for entry in self.by_due[start:end]]
+
+    def by_priority_then_due(self):
+        """ Every task, High to Low, each priority earliest due first and undated last """
+        return [self._task(entry[-1]) for entry in self.by_priority]
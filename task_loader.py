@@ -0,0 +1,115 @@
+from json_stream import iter_records
+from task_index import TaskList, PRIORITY_RANK, NO_DUE_DATE, index_keys
+from task_table import TaskTable, parse_iso_date, NO_DUE_DATE as TABLE_NO_DUE_DATE
+
+try:
+    import numpy as np
+except ImportError:  # Only speeds up indexing a TaskTable; the plain sort below does the same job
+    np = None
+
+
+def load_table(path, parse_date=None):
+    """ Stream a task file into a TaskTable
+
+    Due dates take the cached ISO path; parse_date, when given, resolves any
+    other string (e.g. "tomorrow") the way Task would.
+    """
+    def normalized(records):
+        for record in records:
+            due_date = record.get('due_date')
+            if parse_date and isinstance(due_date, str) and parse_iso_date(due_date) is None:
+                record['due_date'] = parse_date(due_date)
+            yield record
+
+    return TaskTable.from_records(normalized(iter_records(path)))
+
+
+def due_ordinal(due_date):
+    """ Ordinal of a record's due date (date, ISO string or None), None when it has none """
+    if isinstance(due_date, str):
+        due_date = parse_iso_date(due_date)
+    return due_date.toordinal() if due_date else None
+
+
+class LazyTaskList(TaskList):
+    """ A TaskList over stored records that builds each Task the first time it is used
+
+    records is a list of task dicts or a TaskTable. The due date and priority
+    indexes are built from the records directly with one sort each, so
+    loading costs no Task objects at all; overdue(), due_within() and
+    indexing build Tasks only for the rows they return, and a Task once
+    built is kept, so edits made to it stick. fields limits the keys passed
+    to factory, for Task classes that don't take every stored column.
+    """
+
+    def __init__(self, records, factory, fields=None):
+        super().__init__()
+        self.records = records
+        self.factory = factory
+        self.fields = fields
+        self.handles = list(range(len(records)))
+        self.next_handle = iter(range(len(records), 2 ** 63))
+        if isinstance(records, TaskTable) and np is not None:
+            self._index_table(records)
+        else:
+            self._index_records()
+
+    def _index_records(self):
+        """ Build both indexes one record at a time, then sort each once """
+        self.by_due, self.by_priority = [], []
+        for handle in range(len(self.records)):
+            due_date = None if isinstance(self.records, TaskTable) else self.records[handle].get('due_date')
+            if isinstance(due_date, str) and parse_iso_date(due_date) is None:
+                # Relative dates like "tomorrow" need the Task's own parsing, so build those now
+                task = self._task(handle)
+                due_key, priority_key = self.keys[handle] = index_keys(
+                    handle, task.due_date.toordinal() if task.due_date else None, task.priority)
+            else:
+                due_key, priority_key = self._record_keys(handle)
+            if due_key:
+                self.by_due.append(due_key)
+            self.by_priority.append(priority_key)
+        self.by_due.sort()
+        self.by_priority.sort()
+
+    def _index_table(self, table):
+        """ Build both indexes from the table's columns with NumPy sorts """
+        rows = np.arange(len(table))
+        due = np.frombuffer(table.due, dtype=np.int32, count=len(table)).astype(np.int64)
+        dated = due != TABLE_NO_DUE_DATE
+        order = rows[dated][np.lexsort((rows[dated], due[dated]))]
+        self.by_due = list(zip(due[order].tolist(), order.tolist()))
+
+        ranks = np.array([PRIORITY_RANK.get(name, 1) for name in table.priorities.names], dtype=np.int64)
+        rank = ranks[np.frombuffer(table.priority, dtype=np.uint16, count=len(table))]
+        due = np.where(dated, due, NO_DUE_DATE)
+        order = np.lexsort((rows, due, rank))
+        self.by_priority = list(zip(rank[order].tolist(), due[order].tolist(), order.tolist()))
+
+    def _record(self, handle):
+        record = self.records.record(handle) if isinstance(self.records, TaskTable) else self.records[handle]
+        if self.fields is not None:
+            record = {key: value for key, value in record.items() if key in self.fields}
+        return record
+
+    def _record_keys(self, handle):
+        if isinstance(self.records, TaskTable):
+            due = self.records.due[handle]
+            due = None if due == TABLE_NO_DUE_DATE else due
+            priority = self.records.priorities.names[self.records.priority[handle]]
+        else:
+            record = self.records[handle]
+            due, priority = due_ordinal(record.get('due_date')), record.get('priority', 'Medium')
+        return index_keys(handle, due, priority)
+
+    def _task(self, handle):
+        task = self.objects.get(handle)
+        if task is None:
+            task = self.objects[handle] = self.factory(**self._record(handle))
+            self.handle_of[id(task)] = handle
+        return task
+
+    def _keys(self, handle):
+        # Stored rows are indexed from their record until reindex() records new keys
+        keys = self.keys.pop(handle, None)
+        return keys if keys is not None else self._record_keys(handle)
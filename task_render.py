@@ -0,0 +1,28 @@
+import shutil
+import sys
+
+PROMPT_LINES = 2  # Rows kept free at the bottom of a page for the "more" prompt
+
+
+def page_height(stream):
+    """ Rows per page when writing to an interactive terminal, 0 when output shouldn't be paged """
+    if not (hasattr(stream, 'isatty') and stream.isatty() and sys.stdin.isatty()):
+        return 0
+    return max(shutil.get_terminal_size().lines - PROMPT_LINES, 1)
+
+
+def write_lines(lines, stream=None):
+    """ Write prebuilt lines in a single write, a screenful at a time if they overflow the terminal """
+    stream = stream or sys.stdout
+    height = page_height(stream)
+    if not height or len(lines) <= height:
+        stream.write("".join(line + "\n" for line in lines))
+        stream.flush()
+        return
+
+    for start in range(0, len(lines), height):
+        stream.write("".join(line + "\n" for line in lines[start:start + height]))
+        stream.flush()
+        if start + height < len(lines):
+            if input(f"-- {start + height}/{len(lines)}, Enter for more, q to stop -- ").strip().lower() == 'q':
+                break
@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from json_stream import iter_json_array
+
+SYNC_EVERY = 64  # Journal records written before an fsync is forced
+SYNC_INTERVAL = 1.0  # Seconds a written record may wait for its fsync
+COMPACT_EVERY = 1000  # Journal records that trigger a background compaction
+
+
+class TaskStore:
+    """ Snapshot plus append-only journal of task changes
+
+    Every add, update, remove and archive is appended to <path>.journal as
+    one JSON line and fsynced in batches (every SYNC_EVERY records or
+    SYNC_INTERVAL seconds, whichever comes first), so a save costs the same
+    however many tasks there are. Once the journal has COMPACT_EVERY records
+    a background thread folds it into the snapshot at <path>, which is the
+    same JSON list load_tasks always read, with an id on every task and
+    "archived": true on archived ones.
+
+    Stored objects need an id attribute and a to_dict() method.
+    """
+
+    def __init__(self, path, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+        self.records = {}  # id -> task dict, in insertion order
+        self.next_id = 1
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.first_unsynced = 0.0
+        self.journal_records = 0
+        self.compactor = None
+        self.closed = threading.Event()
+        self.flusher = None
+
+    def load(self):
+        """ Read the snapshot, replay the journal(s) on top, and return the task dicts in order """
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                try:
+                    # Streamed a record at a time, so the whole text and parse tree never sit in memory together
+                    for record in iter_json_array(file):
+                        record.setdefault("id", self.next_id)  # Files from before ids existed
+                        self.records[record["id"]] = record
+                        self.next_id = max(self.next_id, record["id"] + 1)
+                except json.JSONDecodeError:
+                    self.records, self.next_id = {}, 1
+                    corrupt = True
+                else:
+                    corrupt = False
+            if corrupt:
+                # Keep the damaged file for inspection instead of compacting over it
+                os.replace(self.path, self.path + ".corrupt")
+                raise ValueError(f"{self.path} is not valid JSON, moved it to {self.path}.corrupt")
+        # A journal left by a compaction that never finished comes first; replaying it again is harmless
+        for path in (self.journal_path + ".old", self.journal_path):
+            if os.path.exists(path):
+                self.journal_records += self._replay(path)
+
+        self.file = open(self.journal_path, "a")
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+        return list(self.records.values())
+
+    def _replay(self, path):
+        count = good = 0
+        with open(path, "rb+") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from a crash; cut it off so new records don't land behind it
+                    file.truncate(good)
+                    break
+                self._apply(entry)
+                count += 1
+                good += len(line)
+        return count
+
+    def _apply(self, entry):
+        op = entry["op"]
+        if op == "remove":
+            self.records.pop(entry["id"], None)
+        else:  # add, update and archive all carry the whole task
+            task = entry["task"]
+            if op == "archive":
+                task["archived"] = True
+            self.records[task["id"]] = task
+            self.next_id = max(self.next_id, task["id"] + 1)
+
+    def _append(self, entry):
+        with self.lock:
+            self._apply(json.loads(json.dumps(entry)))  # Keep our own copy of the task
+            self.file.write(json.dumps(entry) + "\n")
+            if not self.unsynced:
+                self.first_unsynced = time.time()
+            self.unsynced += 1
+            self.journal_records += 1
+            if self.unsynced >= self.sync_every:
+                self._sync()
+        if self.journal_records >= self.compact_every:
+            self.compact()
+
+    def add(self, task):
+        task.id = self.next_id
+        self._append({"op": "add", "task": dict(task.to_dict(), id=task.id)})
+
+    def update(self, task):
+        self._append({"op": "update", "task": dict(task.to_dict(), id=task.id)})
+
+    def remove(self, task):
+        self._append({"op": "remove", "id": task.id})
+
+    def archive(self, task):
+        self._append({"op": "archive", "task": dict(task.to_dict(), id=task.id)})
+
+    def _sync(self):
+        """ Flush and fsync the journal; call with the lock held """
+        if self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def _flush_loop(self):
+        """ Background fsync for records that haven't filled a batch within sync_interval """
+        while not self.closed.wait(self.sync_interval / 2):
+            with self.lock:
+                if self.unsynced and time.time() - self.first_unsynced >= self.sync_interval:
+                    self._sync()
+
+    def compact(self, wait=False):
+        """ Fold the journal into a new snapshot on a background thread
+
+        The journal is switched out under the lock together with a copy of
+        the current tasks, so changes made while the snapshot is written go
+        to a fresh journal and are never lost.
+        """
+        if wait and self.compactor is not None:
+            self.compactor.join()  # Otherwise a compaction already running would make this return early
+        with self.lock:
+            if self.compactor is not None and self.compactor.is_alive():
+                return
+            self._sync()
+            self.file.close()
+            old_path = self.journal_path + ".old"
+            if os.path.exists(old_path):
+                # Left by a compaction that failed; keep its records until a snapshot covers them
+                with open(old_path, "a") as old, open(self.journal_path) as journal:
+                    old.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, old_path)
+            self.file = open(self.journal_path, "a")
+            self.journal_records = 0
+            records = [dict(record) for record in self.records.values()]
+            self.compactor = threading.Thread(target=self._write_snapshot, args=(records,), daemon=True)
+            self.compactor.start()
+        if wait:
+            self.compactor.join()
+
+    def _write_snapshot(self, records):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(records, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+        os.remove(self.journal_path + ".old")  # Only once the snapshot holding its changes is in place
+
+    def close(self):
+        """ Sync, compact if there is anything to fold in, and stop the background threads """
+        if self.compactor is not None:
+            self.compactor.join()
+        if self.journal_records:
+            self.compact(wait=True)
+        self.closed.set()
+        with self.lock:
+            self._sync()
+            self.file.close()
@@ -0,0 +1,168 @@
+from array import array
+from datetime import date
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for where() and count_by_priority()
+    np = None
+
+PRIORITIES = ('High', 'Medium', 'Low')
+STATUSES = ('In Progress', 'On Hold', 'Complete')
+NO_DUE_DATE = 0  # Date ordinals start at 1, so 0 marks a task without a due date
+NO_ID = -1
+
+
+@lru_cache(maxsize=4096)
+def parse_iso_date(text):
+    """ A YYYY-MM-DD string as a date, or None; cached because big lists repeat the same few dates """
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("TaskTable queries need the numpy package (pip install numpy)")
+
+
+class StringPool:
+    """ Strings packed end to end as UTF-8 in one bytearray, addressed by position """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])  # String i is data[offsets[i]:offsets[i + 1]]
+
+    def append(self, text):
+        self.data += text.encode()
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class Codes:
+    """ Small-int codes for a column with few distinct values (priority, status) """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)  # Values outside the usual set still round-trip
+            self.names.append(name)
+        return code
+
+
+class TaskTable:
+    """ Tasks stored column by column, for holding and filtering very large lists
+
+    Due dates are date ordinals in an int32 array, priority and status are
+    two-byte codes, ids are int64 and descriptions live in a StringPool, so
+    a task costs a few bytes plus its description instead of a Python
+    object. Filters run over whole columns with NumPy and return row
+    numbers; record() and tasks() turn rows back into dicts or Task objects
+    only for the rows asked for.
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.due = array('i')
+        self.priority = array('H')  # Unsigned 16-bit, so unusual values have room to round-trip
+        self.status = array('H')
+        self.descriptions = StringPool()
+        self.priorities = Codes(PRIORITIES)
+        self.statuses = Codes(STATUSES)
+
+    @classmethod
+    def from_records(cls, records):
+        """ Build a table from task dicts like the ones in my_tasks.json """
+        table = cls()
+        for record in records:
+            table.append(record['description'], record.get('due_date'), record.get('priority', 'Medium'),
+                         record.get('status', 'In Progress'), record.get('id'))
+        return table
+
+    def append(self, description, due_date=None, priority='Medium', status='In Progress', id=None):
+        """ Add a row; due_date is a date, a YYYY-MM-DD string or None """
+        if isinstance(due_date, str):
+            due_date = parse_iso_date(due_date)
+        self.ids.append(NO_ID if id is None else id)
+        self.due.append(due_date.toordinal() if due_date else NO_DUE_DATE)
+        self.priority.append(self.priorities.code(priority))
+        self.status.append(self.statuses.code(status))
+        self.descriptions.append(description)
+
+    def __len__(self):
+        return len(self.due)
+
+    def nbytes(self):
+        """ Memory held by the columns, for sizing imports """
+        columns = (self.ids, self.due, self.priority, self.status)
+        return sum(column.itemsize * len(column) for column in columns) + self.descriptions.nbytes()
+
+    def record(self, row):
+        """ One row as a task dict, the shape Task(**record) accepts """
+        task_id, due = self.ids[row], self.due[row]
+        record = {'description': self.descriptions[row],
+                  'due_date': date.fromordinal(due) if due != NO_DUE_DATE else None,
+                  'priority': self.priorities.names[self.priority[row]],
+                  'status': self.statuses.names[self.status[row]]}
+        if task_id != NO_ID:
+            record['id'] = task_id
+        return record
+
+    def tasks(self, rows, factory):
+        """ Task objects for the given rows only, built with factory(**record) """
+        return [factory(**self.record(row)) for row in rows]
+
+    def where(self, due_before=None, due_from=None, due_through=None, priority=None, status=None):
+        """ Row numbers matching every given condition, in table order
+
+        due_before keeps dated tasks due before that date (overdue when it
+        is today); due_from / due_through bound the due date inclusively.
+        priority and status take one name or a collection of names.
+        """
+        require_numpy()
+        due = np.frombuffer(self.due, dtype=np.int32, count=len(self))
+        mask = np.ones(len(self), dtype=bool)
+        if due_before is not None:
+            mask &= (due != NO_DUE_DATE) & (due < due_before.toordinal())
+        if due_from is not None:
+            mask &= due >= due_from.toordinal()
+        if due_through is not None:
+            mask &= (due != NO_DUE_DATE) & (due <= due_through.toordinal())
+        if priority is not None:
+            mask &= self._matches(self.priority, self.priorities, priority)
+        if status is not None:
+            mask &= self._matches(self.status, self.statuses, status)
+        return np.flatnonzero(mask)
+
+    def _matches(self, column, codes, names):
+        names = [names] if isinstance(names, str) else names
+        wanted = [codes.codes[name] for name in names if name in codes.codes]
+        return np.isin(np.frombuffer(column, dtype=np.uint16, count=len(self)), wanted)
+
+    def overdue(self, today=None):
+        return self.where(due_before=today or date.today())
+
+    def due_within(self, days, today=None):
+        today = today or date.today()
+        return self.where(due_from=today, due_through=date.fromordinal(today.toordinal() + days))
+
+    def count_by_priority(self):
+        """ Tasks per priority name, counted over the whole column at once """
+        require_numpy()
+        counts = np.bincount(np.frombuffer(self.priority, dtype=np.uint16, count=len(self)),
+                             minlength=len(self.priorities.names))
+        return dict(zip(self.priorities.names, counts.tolist()))
@@ -1,22 +1,35 @@
 import json
 import sys
 from datetime import datetime, date, timedelta
+from task_index import TaskList
+from json_stream import write_records
+from task_loader import LazyTaskList, load_table
+from task_table import parse_iso_date
+from task_render import write_lines
 
 class Task:
+    # No per-task __dict__; priority is interned so every task shares the same few strings
+    __slots__ = ('description', 'due_date', 'priority')
+
     def __init__(self, description, due_date=None, priority='Medium'):
         self.description = description
         self.due_date = self.parse_due_date(due_date)
-        self.priority = priority
+        self.priority = sys.intern(priority) if priority is not None else None  # Older files may hold null
 
-    def parse_due_date(self, due_date):
+    @staticmethod
+    def parse_due_date(due_date):
         if isinstance(due_date, str):
+            parsed = parse_iso_date(due_date)  # Cached; saved files only hold YYYY-MM-DD dates
+            if parsed:
+                return parsed
             try:
                 return datetime.strptime(due_date, '%Y-%m-%d').date()
             except ValueError:
-                return self._parse_relative_date(due_date)
+                return Task._parse_relative_date(due_date)
         return due_date
 
-    def _parse_relative_date(self, due_date_str):
+    @staticmethod
+    def _parse_relative_date(due_date_str):
         today = datetime.now().date()
         due_date_str = due_date_str.lower().strip()
         if due_date_str == 'today':
@@ -31,12 +44,16 @@ class Task:
         return None
 
     def __str__(self):
-        return f"{self.description} (Due: {self.format_due_date()}, Priority: {self.priority})"
+        return self.describe()
+
+    def describe(self, today=None):
+        """ The task as one line, with Today/Tomorrow worked out against the given date """
+        return f"{self.description} (Due: {self.format_due_date(today)}, Priority: {self.priority})"
 
-    def format_due_date(self):
+    def format_due_date(self, today=None):
         if not self.due_date:
             return "No due date"
-        today = datetime.now().date()
+        today = today or datetime.now().date()
         if self.due_date == today:
             return "Today"
         elif self.due_date == today + timedelta(days=1):
@@ -44,11 +61,11 @@ class Task:
         else:
             return self.due_date.strftime("%Y-%m-%d")
 
-    def is_overdue(self):
-        return self.due_date and self.due_date < datetime.now().date()
-    
-    def due_within_one_day(self):
-        today = datetime.now().date()
+    def is_overdue(self, today=None):
+        return self.due_date and self.due_date < (today or datetime.now().date())
+
+    def due_within_one_day(self, today=None):
+        today = today or datetime.now().date()
         return self.due_date and (self.due_date - today).days <= 1
 
 def get_task_from_user():
@@ -79,9 +96,7 @@ def remove_task():
         print("Your to-do list is empty.")
         return
 
-    print("Your to-do list:")
-    for index, task in enumerate(tasks, start=1):
-        print(f"{index}. {task}")
+    write_lines(["Your to-do list:"] + task_lines(tasks, date.today()))
 
     while True:
         try:
@@ -102,50 +117,74 @@ RESET = "\033[0m"
 def supports_color():
     return hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
 
+def task_lines(task_list, today):
+    """ Numbered lines for a list of tasks, all rendered against the same today """
+    return [f"{index}. {task.describe(today)}" for index, task in enumerate(task_list, start=1)]
+
 def display_tasks():
-    if tasks:
-        print("Your to-do list:")
-        for index, task in enumerate(tasks, start=1):
-            task_str = f"{index}. {task}"
-            if task.is_overdue():
-                if supports_color():
-                    print(f"\033[91m{task_str} (OVERDUE)\033[0m")  # Red color for overdue tasks
-                else:
-                    print(f"{task_str} (OVERDUE)")
-            elif task.due_within_one_day():
-                if supports_color():
-                    print(f"\033[38;5;214m{task_str} (DUE SOON)\033[0m")  # Orange color for tasks due within one day
-                else:
-                    print(f"{task_str} (DUE SOON)")
-            else:
-                print(task_str)
-    else:
+    if not tasks:
         print("Your to-do list is empty.")
+        return
+
+    # One clock reading and one terminal check for the whole list, written out in one go
+    today = date.today()
+    color = supports_color()
+    # Range lookups on the due-date index instead of checking every task
+    overdue = {id(task) for task in tasks.overdue(today)}
+    due_soon = {id(task) for task in tasks.due_within(1, today)}
+    lines = ["Your to-do list:"]
+    for task, task_str in zip(tasks, task_lines(tasks, today)):
+        if id(task) in overdue:
+            lines.append(f"\033[91m{task_str} (OVERDUE)\033[0m" if color else f"{task_str} (OVERDUE)")
+        elif id(task) in due_soon:
+            lines.append(f"\033[38;5;214m{task_str} (DUE SOON)\033[0m" if color else f"{task_str} (DUE SOON)")
+        else:
+            lines.append(task_str)
+    write_lines(lines)
+
+def display_by_priority():
+    if not tasks:
+        print("Your to-do list is empty.")
+        return
+    today = date.today()
+    write_lines(["Tasks by priority:"] + [f"- {task.describe(today)}" for task in tasks.by_priority_then_due()])
+
+def display_due_soon():
+    try:
+        days = int(input("Show tasks due within how many days? "))
+    except ValueError:
+        print("Please enter a valid number.")
+        return
+    today = date.today()
+    due_tasks = tasks.due_within(days, today)
+    if due_tasks:
+        write_lines([f"Tasks due in the next {days} day(s):"] + [f"- {task.describe(today)}" for task in due_tasks])
+    else:
+        print(f"Nothing due in the next {days} day(s).")
 
 def check_overdue_tasks():
-    overdue_tasks = [task for task in tasks if task.is_overdue()]
+    today = date.today()
+    overdue_tasks = tasks.overdue(today)
     if overdue_tasks:
-        print("\nOverdue tasks:")
-        for task in overdue_tasks:
-            print(f"\033[91m- {task}\033[0m")  # Red color for overdue tasks
-        print()
+        color = supports_color()
+        lines = [f"\033[91m- {task.describe(today)}\033[0m" if color else f"- {task.describe(today)}" for task in overdue_tasks]
+        write_lines(["", "Overdue tasks:"] + lines + [""])
 
 def save_tasks(tasks, filename='tasks.json'):
-    with open(filename, 'w') as file:
-        json.dump([{'description': task.description, 
-                    'due_date': task.due_date.strftime('%Y-%m-%d') if task.due_date else None, 
-                    'priority': task.priority} for task in tasks], file)
+    # Same format load_tasks reads for this name: a JSON array, or one task per line for .ndjson
+    write_records(filename, ({'description': task.description,
+                              'due_date': task.due_date.strftime('%Y-%m-%d') if task.due_date else None,
+                              'priority': task.priority} for task in tasks))
 
 def load_tasks(filename='tasks.json'):
+    """ Stream the file (a JSON array, or one task per line for .ndjson) into a table; Tasks are built on use """
     try:
-        with open(filename, 'r') as file:
-            tasks_data = json.load(file)
-            return [Task(**task) for task in tasks_data]
+        return LazyTaskList(load_table(filename, Task.parse_due_date), Task, fields=('description', 'due_date', 'priority'))
     except FileNotFoundError:
-        return []
+        return TaskList()
     except json.JSONDecodeError:
         print('Error decoding JSON, returning empty task list. This may be caused by a corrupted file.')
-        return []
+        return TaskList()
 
 def main():
     global tasks
@@ -154,7 +193,7 @@ def main():
     check_overdue_tasks()  # Check for overdue tasks when starting the program
     
     while True:
-        choice = input("Enter 'A' to add a task, 'R' to remove a task, 'D' to display tasks, or 'Q' to quit: ").upper()
+        choice = input("Enter 'A' to add a task, 'R' to remove a task, 'D' to display tasks, 'P' to display by priority, 'N' to see tasks due soon, or 'Q' to quit: ").upper()
         if choice == 'A':
             description, due_date, priority = get_task_from_user()
             add_task(description, due_date, priority)
@@ -162,6 +201,10 @@ def main():
             remove_task()
         elif choice == 'D':
             display_tasks()
+        elif choice == 'P':
+            display_by_priority()
+        elif choice == 'N':
+            display_due_soon()
         elif choice == 'Q':
             save_tasks(tasks)  # Save tasks before quitting
             print("Tasks saved. Goodbye!")
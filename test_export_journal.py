@@ -0,0 +1,126 @@
+import pytest
+
+import first_response
+from export_journal import ExportJournal
+from fake_gitlab import FakeGitLab
+from gitlab_client import GitLabClient
+
+
+def test_resume_keeps_only_checkpointed_rows(tmp_path):
+    path = str(tmp_path / "export.journal")
+    journal = ExportJournal(path)
+    journal.record([1])
+    journal.mark({"page": 1})
+    journal.record([2])  # Never confirmed
+    journal.close()
+
+    journal = ExportJournal(path, resume=True)
+    assert (journal.rows, journal.checkpoint, journal.failed) == ([[1]], {"page": 1}, [])
+    journal.record([3])
+    journal.mark({"page": 2})
+    journal.close()
+    journal = ExportJournal(path, resume=True)
+    assert (journal.rows, journal.checkpoint) == ([[1], [3]], {"page": 2})
+    journal.close()
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "export.journal"
+    path.write_text('{"row": [1]}\n{"checkpoint": {"page": 1}}\n{"row": [2')
+    journal = ExportJournal(str(path), resume=True)
+    assert (journal.rows, journal.checkpoint) == ([[1]], {"page": 1})
+    journal.close()
+
+
+def test_checkpoints_carry_the_failed_items(tmp_path):
+    path = str(tmp_path / "export.journal")
+    journal = ExportJournal(path)
+    journal.mark({"page": 1}, [["a"]])
+    journal.close()
+    journal = ExportJournal(path, resume=True)
+    assert journal.failed == [["a"]]
+    journal.mark({"page": 2}, [])  # Retried successfully
+    journal.close()
+    journal = ExportJournal(path, resume=True)
+    assert journal.failed == []
+    journal.close()
+
+
+def test_without_resume_the_journal_starts_over(tmp_path):
+    path = str(tmp_path / "export.journal")
+    journal = ExportJournal(path)
+    journal.record([1])
+    journal.mark({"page": 1})
+    journal.close()
+    journal = ExportJournal(path)
+    assert (journal.rows, journal.checkpoint) == ([], None)
+    journal.close(remove=True)
+
+
+@pytest.fixture(scope="module")
+def gitlab():
+    server = FakeGitLab(issues=800).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def exporter(gitlab, monkeypatch):
+    """ first_response pointed at the fake GitLab, with every issue labelled "Customer Created" listed """
+    client = GitLabClient(gitlab.url, "token", backoff=0.0)
+    monkeypatch.setattr(first_response, "client", client)
+    monkeypatch.setattr(first_response, "notes_client", client)
+    monkeypatch.setattr(first_response, "group_path", "1")
+    monkeypatch.setattr(first_response, "issues_path", "groups/1/issues")
+    monkeypatch.setattr(first_response, "created_after", "2024-04-01")
+    monkeypatch.setattr(first_response, "max_pending", 10)  # Pages get checkpointed while the run goes on
+    expected = sorted(issue["title"] for issue in gitlab.groups["1"] if "Customer Created" in issue["labels"])
+    assert len(expected) > 200  # Several pages
+    yield expected
+    client.close()
+
+
+def titles(rows):
+    return sorted(row[0] for row in rows)
+
+
+@pytest.mark.parametrize("backend", ["rest", "graphql"])
+def test_interrupted_export_resumes_without_gaps_or_repeats(tmp_path, exporter, monkeypatch, backend):
+    monkeypatch.setattr(first_response, "backend", backend)
+    path = str(tmp_path / "first_response.journal")
+    journal = ExportJournal(path)
+    rows = first_response.get_issues(journal)
+    before = [next(rows) for _ in range(150)]
+    rows.close()  # The run stops part way through
+    journal.close()
+
+    journal = ExportJournal(path, resume=True)
+    assert journal.checkpoint is not None
+    resumed = list(first_response.get_issues(journal))
+    journal.close(remove=True)
+    assert titles(resumed) == exporter
+    assert len(journal.rows) <= len(before)
+
+
+def test_issues_that_failed_are_retried_on_resume(tmp_path, exporter, monkeypatch):
+    monkeypatch.setattr(first_response, "backend", "rest")
+    lookup = first_response.get_first_public_note
+
+    def flaky(issue):
+        if issue.iid % 7 == 0:
+            raise KeyError("created_at")
+        return lookup(issue)
+
+    monkeypatch.setattr(first_response, "get_first_public_note", flaky)
+    path = str(tmp_path / "first_response.journal")
+    journal = ExportJournal(path)
+    first_run = list(first_response.get_issues(journal))
+    journal.close()
+    assert len(first_run) < len(exporter)
+
+    monkeypatch.setattr(first_response, "get_first_public_note", lookup)
+    journal = ExportJournal(path, resume=True)
+    assert journal.failed
+    resumed = list(first_response.get_issues(journal))
+    journal.close(remove=True)
+    assert titles(resumed) == exporter
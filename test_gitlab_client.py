@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from export_metrics import metrics
+from fake_gitlab import FakeGitLab
+from gitlab_client import AdaptiveLimiter, GitLabClient
+
+ISSUES = 250  # Three pages of 100
+PATH = "groups/1/issues"
+
+
+@pytest.fixture(scope="module")
+def gitlab():
+    server = FakeGitLab(issues=ISSUES).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(gitlab):
+    client = GitLabClient(gitlab.url, "token", backoff=0.0)
+    yield client
+    client.close()
+
+
+def ids(pages):
+    return [issue["id"] for page in pages for issue in page]
+
+
+@pytest.mark.parametrize("keyset, workers", [(True, 8), (False, 8), (False, 1)])
+def test_every_issue_once_in_order(client, keyset, workers):
+    params = {"order_by": "id", "sort": "asc"}
+    assert ids(client.iter_pages(PATH, params, keyset=keyset, workers=workers)) == list(range(1, ISSUES + 1))
+
+
+def test_keyset_follows_link_headers(client):
+    pages = list(client.iter_pages_resumable(PATH, keyset=True))
+    assert [len(page) for page, _ in pages] == [100, 100, 50]
+    assert all("next_url" in token for _, token in pages)
+    assert pages[-1][1]["next_url"] is None
+
+
+def test_keyset_falls_back_to_offset_for_other_orderings(client):
+    # The fake, like GitLab, only does keyset pagination when ordering by id
+    params = {"order_by": "created_at", "sort": "asc"}
+    pages = list(client.iter_pages_resumable(PATH, params, keyset=True))
+    assert [token for _, token in pages] == [{"page": 1}, {"page": 2}, {"page": 3}]
+    assert ids(page for page, _ in pages) == list(range(1, ISSUES + 1))
+
+
+@pytest.mark.parametrize("keyset", [True, False])
+@pytest.mark.parametrize("done", [1, 2, 3])
+def test_resume_carries_on_after_the_last_handled_page(client, keyset, done):
+    params = {"order_by": "id", "sort": "asc"}
+    pages = client.iter_pages_resumable(PATH, params, keyset=keyset)
+    first = [next(pages) for _ in range(done)]
+    pages.close()
+    rest = client.iter_pages_resumable(PATH, params, keyset=keyset, resume=first[-1][1])
+    assert ids(page for page, _ in first) + ids(page for page, _ in rest) == list(range(1, ISSUES + 1))
+
+
+def test_first_public_note_stops_at_the_first_public_one(gitlab, client):
+    gitlab.reset()
+    issue = gitlab.groups["1"][0]
+    note = client.first_public_note(issue["project_id"], issue["iid"], per_page=1)
+    assert note == gitlab.issue_notes(issue)[gitlab.private_notes]
+    assert gitlab.stats()["endpoints"]["notes"] == gitlab.private_notes + 1  # One page per note scanned
+
+
+def test_retries_injected_errors():
+    server = FakeGitLab(issues=ISSUES, error_rate=0.3, error_statuses=(429, 502, 503)).start()
+    client = GitLabClient(server.url, "token", backoff=0.0, max_retries=20)
+    try:
+        assert ids(client.iter_pages(PATH, {"order_by": "id", "sort": "asc"})) == list(range(1, ISSUES + 1))
+        assert server.stats()["requests"] > 3
+    finally:
+        client.close()
+        server.stop()
+
+
+class Response:
+    """ Just what AdaptiveLimiter.observe reads from a response """
+
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_limiter_grows_by_about_one_per_round_trip():
+    limiter = AdaptiveLimiter(initial=4, maximum=16)
+    for _ in range(4):
+        limiter.observe(Response(), time.time())
+    assert limiter.limit == pytest.approx(5, abs=0.1)
+    for _ in range(1000):
+        limiter.observe(Response(), time.time())
+    assert limiter.limit == 16
+
+
+def test_limiter_halves_once_per_burst_of_throttled_responses():
+    limiter = AdaptiveLimiter(initial=8, maximum=16)
+    started = time.time()
+    limiter.observe(Response(429), started)
+    assert limiter.limit == 4
+    limiter.observe(Response(503), started)  # Sent before the cut, so part of the same burst
+    assert limiter.limit == 4
+    limiter.observe(Response(429), time.time())
+    assert limiter.limit == 2
+    for _ in range(5):
+        limiter.observe(Response(429), time.time())
+    assert limiter.limit == limiter.minimum
+
+
+def test_limiter_ignores_server_errors():
+    limiter = AdaptiveLimiter(initial=4)
+    limiter.observe(Response(502), time.time())
+    assert limiter.limit == 4
+
+
+def test_limiter_pauses_until_the_quota_resets():
+    limiter = AdaptiveLimiter()
+    reset = int(time.time()) + 60
+    limiter.observe(Response(200, {"RateLimit-Remaining": "0", "RateLimit-Reset": str(reset)}), time.time())
+    assert limiter.paused_until == reset
+    limiter.observe(Response(200, {"RateLimit-Remaining": "50", "RateLimit-Reset": str(reset + 60)}), time.time())
+    assert limiter.paused_until == reset
+
+
+def test_limiter_holds_requests_past_the_limit():
+    limiter = AdaptiveLimiter(initial=2, maximum=2)
+    limiter.acquire()
+    limiter.acquire()
+    let_through = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), let_through.set()))
+    waiter.start()
+    assert not let_through.wait(0.2)
+    limiter.release(Response(), time.time())
+    assert let_through.wait(2)
+    waiter.join()
+    assert limiter.in_flight == 2
+
+
+def test_client_cuts_its_limit_on_429s():
+    server = FakeGitLab(issues=ISSUES, error_rate=1.0, error_statuses=(429,)).start()
+    client = GitLabClient(server.url, "token", backoff=0.0, max_retries=3)
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            list(client.iter_pages(PATH))
+        assert client.limiter.limit == client.limiter.minimum  # 4 -> 2 -> 1, each retry sent after the last cut
+        assert server.stats()["statuses"] == {"429": 4}
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_metrics_count_bytes_as_sent_over_the_wire():
+    server = FakeGitLab(issues=ISSUES, compress=True).start()
+    client = GitLabClient(server.url, "token", backoff=0.0)
+    recorded = lambda: metrics.endpoints.get("/groups/:id/issues", {}).get("bytes", 0)
+    try:
+        before = recorded()
+        pages = list(client.iter_pages(PATH, {"order_by": "id", "sort": "asc"}))
+        sent = recorded() - before
+        assert sent == server.stats()["bytes"]  # gzip-compressed bodies, as the fake counted them
+        assert sent < sum(len(json.dumps(page)) for page in pages) / 2
+    finally:
+        client.close()
+        server.stop()
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from fake_gitlab import FakeGitLab
+from gitlab_client import GitLabClient
+from http_cache import TOUCH_BATCH, HttpCache
+
+ISSUES = 250
+PATH = "groups/1/issues"
+PARAMS = {"order_by": "id", "sort": "asc"}
+
+
+@pytest.fixture(scope="module")
+def gitlab():
+    server = FakeGitLab(issues=ISSUES).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path / "http_cache.db"))
+    yield cache
+    cache.close()
+
+
+def fetch(gitlab, cache, token="token", keyset=False, params=PARAMS):
+    """ Every page of PATH through a client using the cache, and the statuses the server answered with """
+    client = GitLabClient(gitlab.url, token, backoff=0.0, cache=cache)
+    gitlab.reset()
+    try:
+        pages = [page for page, _ in client.iter_pages_resumable(PATH, params, keyset=keyset)]
+    finally:
+        client.close()
+    return pages, gitlab.stats()["statuses"]
+
+
+def stored_bytes(cache):
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+@pytest.mark.parametrize("keyset", [True, False])
+def test_a_repeat_pass_is_served_by_304s(gitlab, cache, keyset):
+    first, statuses = fetch(gitlab, cache, keyset=keyset)
+    assert statuses == {"200": 3}
+    second, statuses = fetch(gitlab, cache, keyset=keyset)
+    assert statuses == {"304": 3}
+    assert second == first
+    assert [issue["id"] for page in second for issue in page] == list(range(1, ISSUES + 1))
+
+
+def test_entries_survive_a_reopen(gitlab, tmp_path):
+    path = str(tmp_path / "http_cache.db")
+    cache = HttpCache(path)
+    first, _ = fetch(gitlab, cache)
+    for _ in range(TOUCH_BATCH // 3 + 1):  # Enough hits to write a batch of last_used updates
+        fetch(gitlab, cache)
+    cache.close()
+
+    cache = HttpCache(path)
+    try:
+        assert cache.total_bytes == stored_bytes(cache)
+        second, statuses = fetch(gitlab, cache)
+        assert statuses == {"304": 3} and second == first
+    finally:
+        cache.close()
+
+
+def test_eviction_keeps_the_total_under_max_bytes(gitlab, tmp_path):
+    pages, _ = fetch(gitlab, None, params=dict(PARAMS, per_page=10))  # Without a cache, to size the pages
+    page_bytes = max(len(json.dumps(page)) for page in pages)  # The fake's bodies are plain json.dumps
+    cache = HttpCache(str(tmp_path / "http_cache.db"), max_bytes=3 * page_bytes)
+    try:
+        client = GitLabClient(gitlab.url, "token", backoff=0.0, cache=cache)
+        for page in range(1, len(pages) + 1):
+            client.get_json(PATH, dict(PARAMS, per_page=10, page=page))
+            assert cache.total_bytes == stored_bytes(cache)
+            assert 0 < cache.total_bytes <= cache.max_bytes
+        client.close()
+        kept = [key for key, in cache.conn.execute("SELECT key FROM responses ORDER BY last_used")]
+        assert len(kept) in (2, 3)
+        assert kept[-1].endswith(f"page={len(pages)}&per_page=10&sort=asc")  # The most recent survives
+    finally:
+        cache.close()
+
+    shrunk = HttpCache(str(tmp_path / "http_cache.db"), max_bytes=page_bytes)  # A smaller limit applies on open
+    try:
+        assert shrunk.total_bytes == stored_bytes(shrunk) <= page_bytes
+        assert shrunk.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+    finally:
+        shrunk.close()
+
+
+def test_tokens_do_not_share_entries(gitlab, cache):
+    fetch(gitlab, cache, token="first")
+    pages, statuses = fetch(gitlab, cache, token="second")
+    assert statuses == {"200": 3}  # Nothing the first token fetched was offered as a validator
+    assert cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 6
+    _, statuses = fetch(gitlab, cache, token="first")
+    assert statuses == {"304": 3}
+
+
+def test_keys_ignore_parameter_order_and_never_hold_the_token():
+    url = "https://gitlab.example.com/api/v4/" + PATH
+    assert HttpCache.key(url, {"a": 1, "b": 2}, "secret") == HttpCache.key(url, {"b": 2, "a": 1}, "secret")
+    assert HttpCache.key(url, None, "secret") != HttpCache.key(url, None, "other")
+    assert "secret" not in HttpCache.key(url, {"a": 1}, "secret")
+    assert HttpCache.key(url) == url
@@ -0,0 +1,58 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from issue_record import IssueRecord, format_iso, parse_iso
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def expected_ms(value):
+    """ What datetime makes of the timestamp, in epoch milliseconds """
+    return (datetime.fromisoformat(value.replace('Z', '+00:00')) - EPOCH) // timedelta(milliseconds=1)
+
+
+@pytest.mark.parametrize("value", [
+    "2024-05-01T12:34:56.789Z",
+    "2024-05-01T12:34:56Z",
+    "2024-05-01T12:34:56.7Z",
+    "2024-05-01T12:34:56.789123Z",
+    "2024-05-01T12:34:56.789+02:00",
+    "2024-05-01T00:10:00-05:30",
+    "2024-02-29T23:59:59.999Z",
+    "1999-12-31T23:59:59Z",
+])
+def test_gitlab_shapes_match_datetime(value):
+    assert parse_iso(value) == expected_ms(value)
+
+
+@pytest.mark.parametrize("value", ["2024-05-01", "2024-05-01 12:34:56", "2024-05-01T12:34:56+0200"])
+def test_other_shapes_fall_back_to_datetime(value):
+    expected = datetime.fromisoformat(value)
+    if expected.tzinfo is None:
+        expected = expected.replace(tzinfo=timezone.utc)  # Naive timestamps are taken as UTC
+    assert parse_iso(value) == (expected - EPOCH) // timedelta(milliseconds=1)
+
+
+@pytest.mark.parametrize("value", [None, ""])
+def test_missing_stays_missing(value):
+    assert parse_iso(value) is None
+
+
+def test_random_timestamps_round_trip():
+    rng = random.Random(0)
+    for _ in range(2000):
+        moment = EPOCH + timedelta(milliseconds=rng.randrange(0, 2 ** 41))
+        value = moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+        ms = parse_iso(value)
+        assert ms == expected_ms(value)
+        assert format_iso(ms) == moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def test_from_json_keeps_missing_time_stats_as_none():
+    issue = {"id": 1, "iid": 2, "project_id": 3, "title": "t", "created_at": "2024-05-01T12:34:56.789Z"}
+    record = IssueRecord.from_json(issue)
+    assert record.time_spent is None
+    assert record.created_at == expected_ms(issue["created_at"])
+    assert IssueRecord.from_list(record.as_list()).as_list() == record.as_list()
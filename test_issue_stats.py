@@ -0,0 +1,142 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from issue_record import IssueRecord
+from issue_stats import IssueColumns, PERCENTILES, compute_stats, load_columns, summarize, week_starts
+
+DAY = 86400000
+START = datetime(2024, 4, 1, tzinfo=timezone.utc)  # A Monday
+
+
+def ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def issue(id, created, closed=None, state=None, labels=(), assignee=None, project=1):
+    return IssueRecord(id=id, project_id=project, state=state or ("closed" if closed else "opened"), labels=labels,
+                       created_at=ms(created), closed_at=ms(closed) if closed else None, assignee_name=assignee)
+
+
+def random_issues(seed, count=2000):
+    rng = random.Random(seed)
+    issues, first_responses = [], {}
+    for i in range(count):
+        created = START + timedelta(minutes=rng.randrange(0, 90 * 24 * 60))
+        closed = created + timedelta(minutes=rng.randrange(1, 40 * 24 * 60)) if rng.random() < 0.6 else None
+        issues.append(issue(i, created, closed, labels=tuple(rng.sample("abcdef", rng.randint(0, 3))),
+                            assignee=rng.choice(["ada", "grace", None]), project=rng.choice([7, 8, 900000])))
+        if rng.random() < 0.5:
+            first_responses[i] = ms(created) + rng.randrange(1, 10 * DAY)
+    return issues, first_responses
+
+
+def expected(days):
+    """ The summary np.percentile and np.mean give for a plain list of durations in days """
+    if not days:
+        return {"count": 0, "mean": None, **{f"p{p}": None for p in PERCENTILES}}
+    return {"count": len(days), "mean": float(np.mean(days)),
+            **dict(zip((f"p{p}" for p in PERCENTILES), np.percentile(days, PERCENTILES).tolist()))}
+
+
+def assert_summary(summary, wanted):
+    assert summary.keys() == wanted.keys()
+    for key, value in wanted.items():
+        assert summary[key] == (value if value is None or key == "count" else pytest.approx(value, rel=1e-12))
+
+
+@pytest.mark.parametrize("values", [[5.0], [1.0, 2.0], [3.0, 1.0, 2.0, 10.0], list(range(1, 101)), [2.0] * 7])
+def test_percentiles_match_numpy(values):
+    seconds = np.array(values, dtype=np.float64) * 86400
+    assert_summary(summarize(seconds), expected(values))
+
+
+def test_nan_is_left_out_of_every_figure():
+    seconds = np.array([np.nan, 86400, np.nan, 3 * 86400])
+    assert_summary(summarize(seconds), expected([1.0, 3.0]))
+    assert_summary(summarize(np.full(3, np.nan)), expected([]))
+    assert_summary(summarize(np.empty(0)), expected([]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_breakdowns_match_a_plain_per_group_computation(seed):
+    issues, first_responses = random_issues(seed)
+    stats = compute_stats(issues, first_responses)
+
+    def days(record, metric):
+        if metric == "closure":
+            end = record.closed_at if record.state == "closed" else None
+        else:
+            end = first_responses.get(record.id)
+        return None if end is None else (end - record.created_at) / DAY
+
+    keys = {
+        "assignee": lambda record: [record.assignee_name or "Unassigned"],
+        "project": lambda record: [record.project_id],
+        "label": lambda record: list(record.labels),
+        "week": lambda record: [str(week_starts(np.array([record.created_at], "datetime64[ms]"))[0])]
+    }
+    for metric in ("closure", "first_response"):
+        everything = [days(record, metric) for record in issues]
+        assert_summary(stats[metric], expected([value for value in everything if value is not None]))
+        for by, key in keys.items():
+            groups = {}
+            for record in issues:
+                for group in key(record):
+                    groups.setdefault(group, [])
+                    if days(record, metric) is not None:
+                        groups[group].append(days(record, metric))
+            found = stats["breakdowns"][(by, metric)]
+            assert found.keys() == groups.keys()
+            for group, values in groups.items():
+                assert_summary(found[group], expected(values))
+
+
+def test_open_and_unanswered_issues_count_as_opened_only():
+    issues = [
+        issue(1, START, START + timedelta(days=2)),
+        issue(2, START),  # Still open
+        issue(3, START, START + timedelta(days=5), state="opened"),  # Reopened: its old closed_at is ignored
+    ]
+    stats = compute_stats(issues, {1: ms(START + timedelta(hours=12))})
+    assert (stats["opened"], stats["closed"]) == (3, 1)
+    assert_summary(stats["closure"], expected([2.0]))
+    assert_summary(stats["first_response"], expected([0.5]))
+    assert stats["breakdowns"][("assignee", "closure")]["Unassigned"]["count"] == 1
+
+
+@pytest.mark.parametrize("created, monday", [
+    ("2024-04-01T00:00:00", "2024-04-01"),  # Monday itself
+    ("2024-04-07T23:59:59", "2024-04-01"),  # Sunday still belongs to the week before
+    ("2024-04-08T00:00:00", "2024-04-08"),
+    ("1970-01-01T12:00:00", "1969-12-29"),  # The epoch was a Thursday
+    ("2024-12-31T10:00:00", "2024-12-30"),  # Weeks run across the new year
+])
+def test_weeks_start_on_monday(created, monday):
+    assert str(week_starts(np.array([created], "datetime64[ms]"))[0]) == monday
+    record = issue(1, datetime.fromisoformat(created).replace(tzinfo=timezone.utc))
+    assert load_columns([record])["names"]["week"] == [monday]
+
+
+def test_columns_filled_page_by_page_give_the_same_stats():
+    issues, first_responses = random_issues(7)
+    columns = IssueColumns()
+    for start in range(0, len(issues), 100):
+        columns.extend(issues[start:start + 100])
+    assert len(columns) == len(issues)
+    by_pages, at_once = compute_stats(columns, first_responses), compute_stats(issues, first_responses)
+    assert by_pages.keys() == at_once.keys()
+    assert by_pages["breakdowns"].keys() == at_once["breakdowns"].keys()
+    for key, summaries in at_once["breakdowns"].items():
+        assert list(by_pages["breakdowns"][key]) == list(summaries)
+        for group, summary in summaries.items():
+            assert_summary(by_pages["breakdowns"][key][group], summary)
+
+
+def test_no_issues():
+    stats = compute_stats([])
+    assert (stats["opened"], stats["closed"]) == (0, 0)
+    assert stats["closure"]["mean"] is None
+    assert all(not groups for groups in stats["breakdowns"].values())
@@ -0,0 +1,70 @@
+import io
+import json
+
+import pytest
+
+from json_stream import iter_json_array, iter_records, write_records
+
+CHUNK_SIZES = (1, 2, 3, 7, 64, 1 << 16)
+
+
+def read(text, chunk_size):
+    return list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    '[]',
+    ' [ ] \n',
+    '[1.5]',
+    '[1e5, 2]',
+    '[-12.25E-3,7,0]',
+    '[123456789, 3.14159]',
+    '[true, false, null, NaN, -Infinity]',
+    '["a,]b", "\\"q\\"", "\\u00e9"]',
+    '[{"description": "x", "due_date": "2026-10-18"}, [1, [2, {}]], {}]',
+    '[\n  {"a": 1},\n  {"b": [1.25, 2]}\n]\n',
+])
+def test_matches_json_loads_across_chunk_boundaries(text, chunk_size):
+    assert read(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    '',
+    '{}',
+    '[1 2]',
+    '[{}{}]',
+    '[1,,2]',
+    '[,1]',
+    '[1,]',
+    '[1] x',
+    '[1][2]',
+    '[1, 2',
+    '[{"a": 1}, {"b"',
+])
+def test_rejects_malformed_arrays(text, chunk_size):
+    with pytest.raises(json.JSONDecodeError):
+        read(text, chunk_size)
+
+
+def test_yields_items_before_the_damage():
+    items = iter_json_array(io.StringIO('[{"a": 1}, {"b": 2}, oops]'), 4)
+    assert next(items) == {"a": 1}
+    assert next(items) == {"b": 2}
+    with pytest.raises(json.JSONDecodeError):
+        next(items)
+
+
+@pytest.mark.parametrize("name", ["tasks.json", "tasks.ndjson", "tasks.jsonl"])
+def test_write_records_round_trips_by_suffix(tmp_path, name):
+    records = [{"description": "a", "due_date": None}, {"description": "b\nc", "due_date": "2026-10-18"}]
+    path = str(tmp_path / name)
+    write_records(path, iter(records))
+    assert list(iter_records(path)) == records
+
+
+def test_empty_ndjson_file(tmp_path):
+    path = tmp_path / "tasks.ndjson"
+    path.write_text("")
+    assert list(iter_records(str(path))) == []
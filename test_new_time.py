@@ -0,0 +1,55 @@
+import time
+
+import pytest
+import requests
+
+import new_time
+from fake_gitlab import FakeGitLab
+from gitlab_client import GitLabClient
+
+ISSUES = 3000  # 61 days from 2024-04-01, so three calendar months and about thirty pages
+
+
+@pytest.fixture(scope="module")
+def gitlab():
+    server = FakeGitLab(groups=("1", "2"), issues=ISSUES).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(gitlab, monkeypatch):
+    client = GitLabClient(gitlab.url, "token", backoff=0.0)
+    monkeypatch.setattr(new_time, "client", client)
+    yield client
+    client.close()
+
+
+def test_every_issue_once_across_groups_and_overlapping_windows(gitlab, client):
+    windows = [("2024-04-01", "2024-04-20"), ("2024-04-10", "2024-07-01")]  # 04-10 to 04-20 is fetched twice
+    ids = [issue.id for issue in new_time.fetch_issues_from_groups(["1", "2"], windows)]
+    assert sorted(ids) == sorted(issue["id"] for group in gitlab.groups.values() for issue in group)
+
+
+def test_a_slow_reader_holds_the_jobs_back(gitlab, client, monkeypatch):
+    monkeypatch.setattr(new_time, "PAGE_BUFFER", 2)
+    monkeypatch.setattr(new_time, "MAX_CONCURRENCY", 2)
+    gitlab.reset()
+    issues = new_time.fetch_issues_from_groups(["1", "2"], [("2024-04-01", "2024-07-01")])
+    next(issues)
+    time.sleep(0.5)
+    # The page being read, two buffered and one waiting in each job; far from the ~60 pages in total
+    assert gitlab.stats()["endpoints"]["issues"] <= 6
+    issues.close()
+
+
+def test_a_failed_job_ends_the_run(monkeypatch):
+    server = FakeGitLab(issues=300, error_rate=1.0, error_statuses=(502,)).start()
+    client = GitLabClient(server.url, "token", backoff=0.0, max_retries=1)
+    monkeypatch.setattr(new_time, "client", client)
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            list(new_time.fetch_issues_from_groups(["1"], [("2024-04-01", "2024-06-01")]))
+    finally:
+        client.close()
+        server.stop()
@@ -0,0 +1,86 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from my_tasks import Task
+from task_index import PRIORITY_RANK, TaskList
+
+TODAY = date(2026, 10, 18)
+
+
+def random_task(rng, number):
+    due = rng.choice([None, TODAY + timedelta(days=rng.randint(-10, 10))])
+    return Task(f"task {number}", due, rng.choice(['High', 'Medium', 'Low']))
+
+
+def overdue_scan(tasks):
+    return sorted((task for task in tasks if task.due_date and task.due_date < TODAY), key=lambda task: task.due_date)
+
+
+def due_within_scan(tasks, days):
+    end = TODAY + timedelta(days=days)
+    return sorted((task for task in tasks if task.due_date and TODAY <= task.due_date <= end),
+                  key=lambda task: task.due_date)
+
+
+def priority_scan(tasks):
+    return sorted(tasks, key=lambda task: (PRIORITY_RANK[task.priority], task.due_date or date.max))
+
+
+def same_order(found, expected):
+    """ Tasks in the same order, ignoring how ties on the sort key are broken """
+    return [id(task) for task in found] == [id(task) for task in expected] or \
+        [(task.due_date, task.priority) for task in found] == [(task.due_date, task.priority) for task in expected] \
+        and {id(task) for task in found} == {id(task) for task in expected}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_indexes_match_linear_scans_through_random_edits(seed):
+    rng = random.Random(seed)
+    tasks = TaskList(random_task(rng, number) for number in range(50))
+    plain = list(tasks)
+    for step in range(300):
+        action = rng.random()
+        if action < 0.3:
+            task = random_task(rng, 100 + step)
+            tasks.append(task)
+            plain.append(task)
+        elif action < 0.5 and plain:
+            index = rng.randrange(len(plain))
+            assert tasks.pop(index) is plain.pop(index)
+        elif plain:
+            task = plain[rng.randrange(len(plain))]
+            task.due_date = rng.choice([None, TODAY + timedelta(days=rng.randint(-10, 10))])
+            task.priority = rng.choice(['High', 'Medium', 'Low'])
+            tasks.reindex(task)
+
+        assert list(tasks) == plain
+        assert same_order(tasks.overdue(TODAY), overdue_scan(plain))
+        assert same_order(tasks.due_within(2, TODAY), due_within_scan(plain, 2))
+        assert same_order(tasks.by_priority_then_due(), priority_scan(plain))
+
+
+def test_list_behaviour():
+    first, second, third = Task("a"), Task("b", TODAY), Task("c", TODAY - timedelta(days=1), "High")
+    tasks = TaskList([first, second, third])
+    assert len(tasks) == 3
+    assert tasks[0] is first and tasks[-1] is third
+    assert tasks[1:] == [second, third]
+    assert tasks.pop() is third
+    assert list(tasks) == [first, second]
+    assert tasks.overdue(TODAY) == []
+    assert tasks.due_within(0, TODAY) == [second]
+
+
+def test_ties_keep_insertion_order_and_undated_tasks_come_last():
+    tasks = TaskList([Task("undated", None, "High"), Task("x", TODAY, "High"), Task("y", TODAY, "High"),
+                      Task("low", TODAY - timedelta(days=5), "Low")])
+    assert [task.description for task in tasks.by_priority_then_due()] == ["x", "y", "undated", "low"]
+    assert [task.description for task in tasks.due_within(0, TODAY)] == ["x", "y"]
+
+
+def test_unknown_priority_sorts_as_medium():
+    tasks = TaskList([Task("odd", TODAY, "Urgent"), Task("medium", TODAY - timedelta(days=1)),
+                      Task("low", TODAY, "Low")])
+    assert [task.description for task in tasks.by_priority_then_due()] == ["medium", "odd", "low"]
@@ -0,0 +1,105 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import task_loader
+import tasks_dates
+from json_stream import write_records
+from task_index import TaskList
+from task_loader import LazyTaskList, load_table
+from task_table import TaskTable, parse_iso_date
+
+TODAY = date(2026, 10, 18)
+FIELDS = ('description', 'due_date', 'priority')
+
+
+def make_records(count=300, seed=1):
+    rng = random.Random(seed)
+    return [{'description': f'task {i}',
+             'due_date': rng.choice([None, (TODAY + timedelta(days=rng.randint(-20, 20))).isoformat()]),
+             'priority': rng.choice(['High', 'Medium', 'Low', 'Urgent'])} for i in range(count)]
+
+
+def keys(tasks):
+    return [(task.description, task.due_date, task.priority) for task in tasks]
+
+
+def lazy_lists(records):
+    """ The same records behind each kind of LazyTaskList """
+    yield LazyTaskList([dict(record) for record in records], tasks_dates.Task)
+    yield LazyTaskList(TaskTable.from_records(records), tasks_dates.Task, fields=FIELDS)
+
+
+@pytest.fixture(params=["numpy", "plain"])
+def indexing(request, monkeypatch):
+    if request.param == "plain":
+        monkeypatch.setattr(task_loader, "np", None)
+
+
+def test_queries_match_an_eager_list(indexing):
+    records = make_records()
+    eager = TaskList(tasks_dates.Task(**record) for record in records)
+    for tasks in lazy_lists(records):
+        assert keys(tasks.overdue(TODAY)) == keys(eager.overdue(TODAY))
+        assert keys(tasks.due_within(3, TODAY)) == keys(eager.due_within(3, TODAY))
+        assert keys(tasks.by_priority_then_due()) == keys(eager.by_priority_then_due())
+        assert keys(tasks) == keys(eager)
+
+
+def test_tasks_are_built_only_when_used():
+    tasks = LazyTaskList(TaskTable.from_records(make_records()), tasks_dates.Task, fields=FIELDS)
+    assert not tasks.objects
+    overdue = tasks.overdue(TODAY)
+    assert len(tasks.objects) == len(overdue) < len(tasks)
+    assert tasks[0] is tasks[0]  # Built once, then kept
+
+
+def test_edits_pop_and_append_follow_an_eager_list(indexing):
+    records = make_records()
+    for tasks in lazy_lists(records):
+        eager = TaskList(tasks_dates.Task(**record) for record in records)
+        for task_list in (tasks, eager):
+            task = task_list[10]
+            task.priority, task.due_date = 'High', TODAY - timedelta(days=1)
+            task_list.reindex(task)
+            task_list.append(task_list.pop(3))
+            assert task_list.pop(0).description == 'task 0'
+        assert keys(tasks.overdue(TODAY)) == keys(eager.overdue(TODAY))
+        assert keys(tasks.by_priority_then_due()) == keys(eager.by_priority_then_due())
+        assert keys(tasks[:]) == keys(eager[:])
+
+
+def test_relative_dates_resolve_like_task(tmp_path):
+    records = [{'description': 'soon', 'due_date': 'tomorrow', 'priority': 'High'},
+               {'description': 'later', 'due_date': '2999-01-01', 'priority': 'Low'}]
+    tomorrow = date.today() + timedelta(days=1)
+    path = str(tmp_path / 'tasks.json')
+    write_records(path, records)
+    for tasks in (tasks_dates.load_tasks(path), LazyTaskList(records, tasks_dates.Task)):
+        assert [task.description for task in tasks.due_within(1)] == ['soon']
+        assert tasks[0].due_date == tomorrow
+
+
+@pytest.mark.parametrize("name", ["tasks.json", "tasks.ndjson"])
+def test_save_and_load_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    tasks_dates.save_tasks(TaskList(tasks_dates.Task(**record) for record in make_records(20)), path)
+    loaded = tasks_dates.load_tasks(path)
+    assert keys(loaded) == keys(tasks_dates.Task(**record) for record in make_records(20))
+    assert len(load_table(path)) == 20
+
+
+def test_missing_and_corrupt_files_load_empty(tmp_path):
+    assert len(tasks_dates.load_tasks(str(tmp_path / 'missing.json'))) == 0
+    corrupt = tmp_path / 'tasks.json'
+    corrupt.write_text('[{"description": "a"}, {"desc')
+    assert len(tasks_dates.load_tasks(str(corrupt))) == 0
+
+
+def test_parse_iso_date():
+    assert parse_iso_date('2026-10-18') == TODAY
+    assert parse_iso_date('2026-10-18') is parse_iso_date('2026-10-18')
+    assert parse_iso_date('tomorrow') is None
+    assert parse_iso_date('2026-02-30') is None
+    assert tasks_dates.Task.parse_due_date('2026-1-5') == date(2026, 1, 5)  # strptime still takes these
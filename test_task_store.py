@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+from my_tasks import Task
+from task_store import TaskStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "my_tasks.json")
+
+
+def descriptions(records):
+    return [record["description"] for record in records]
+
+
+def test_changes_survive_a_reopen(path):
+    store = TaskStore(path)
+    assert store.load() == []
+    first, second, third = Task("first"), Task("second", "2026-10-18", "High"), Task("third")
+    for task in (first, second, third):
+        store.add(task)
+    assert [first.id, second.id, third.id] == [1, 2, 3]
+    second.status = "Complete"
+    store.update(second)
+    store.remove(first)
+    store.archive(third)
+    store.close()
+
+    records = TaskStore(path).load()
+    assert descriptions(records) == ["second", "third"]
+    assert records[0]["status"] == "Complete" and records[0]["due_date"] == "2026-10-18"
+    assert records[1].get("archived") is True
+
+
+def test_journal_is_replayed_after_a_crash(path):
+    store = TaskStore(path)
+    store.load()
+    task = Task("written")
+    store.add(task)
+    store.sync()  # No close(): the process dies here
+    assert not os.path.exists(path)
+
+    reopened = TaskStore(path)
+    assert descriptions(reopened.load()) == ["written"]
+    reopened.add(Task("next"))
+    assert reopened.records[2]["description"] == "next"  # Ids carry on after replayed ones
+    reopened.close()
+
+
+def test_torn_journal_line_is_cut_off(path):
+    store = TaskStore(path)
+    store.load()
+    store.add(Task("kept"))
+    store.sync()
+    with open(path + ".journal", "a") as journal:
+        journal.write('{"op": "add", "task": {"descr')
+
+    reopened = TaskStore(path)
+    assert descriptions(reopened.load()) == ["kept"]
+    reopened.add(Task("after"))
+    reopened.close()
+    assert descriptions(TaskStore(path).load()) == ["kept", "after"]
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(path):
+    store = TaskStore(path, compact_every=10)
+    store.load()
+    tasks = [Task(f"task {i}") for i in range(25)]
+    for task in tasks:
+        store.add(task)
+    store.compact(wait=True)
+    with open(path) as file:
+        assert len(json.load(file)) == 25
+    assert not os.path.exists(path + ".journal.old")
+    store.remove(tasks[0])
+    store.close()
+    assert descriptions(TaskStore(path).load()) == [f"task {i}" for i in range(1, 25)]
+
+
+def test_leftover_old_journal_is_replayed(path):
+    store = TaskStore(path)
+    store.load()
+    store.add(Task("from the old journal"))
+    store.sync()
+    store.file.close()
+    os.replace(path + ".journal", path + ".journal.old")  # A compaction that never finished
+
+    reopened = TaskStore(path)
+    assert descriptions(reopened.load()) == ["from the old journal"]
+    reopened.close()
+    assert not os.path.exists(path + ".journal.old")
+    assert descriptions(TaskStore(path).load()) == ["from the old journal"]
+
+
+def test_snapshot_without_ids_gets_them(path):
+    with open(path, "w") as file:
+        json.dump([{"description": "a"}, {"description": "b"}], file)
+    store = TaskStore(path)
+    assert [record["id"] for record in store.load()] == [1, 2]
+    task = Task("c")
+    store.add(task)
+    assert task.id == 3
+    store.close()
+
+
+def test_corrupt_snapshot_is_moved_aside(path):
+    with open(path, "w") as file:
+        file.write('[{"description": "a"}, {"desc')
+    store = TaskStore(path)
+    with pytest.raises(ValueError):
+        store.load()
+    assert os.path.exists(path + ".corrupt") and not os.path.exists(path)
+    assert store.records == {}
+    assert store.load() == []  # Starting again from the journal alone works
+    store.close()
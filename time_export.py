@@ -1,49 +1,94 @@
-import requests
-import csv
+from concurrent.futures import ThreadPoolExecutor
+from export_metrics import metrics, profiling
+from export_sinks import Column, open_sink
+from gitlab_client import GitLabClient
+from issue_record import IssueRecord
 
 # Configuration
-API_URL = "https://www.gitlab.com/api/v4"
+API_URL = "https://gitlab.com/api/v4"
 TOKEN = ""
 GROUP_ID = "xxx"
+ENGINEER_IDS = [111, 222, 333]  # Replace with the user IDs of the engineers
 CSV_FILE = "/path/to/file/time_tracking_data.csv"  # Name of the CSV file to export data
+OUTPUT_FORMAT = None  # None goes by CSV_FILE's suffix: .csv, .ndjson(.gz/.zst), .parquet or .arrow
+PER_ASSIGNEE = True  # Fetch one assignee_id= stream per engineer instead of the whole group
+MAX_WORKERS = 8  # Engineer streams fetched in parallel
+METRICS_PATH = None  # e.g. "metrics.json", or "metrics.prom" for the Prometheus textfile collector
+PROFILE = None  # "cprofile" or "tracemalloc" to print where time or memory goes
 
+# Time spent is in seconds, typed as a duration in Parquet/Arrow output
+OUTPUT_COLUMNS = [
+    Column("issue_id", "int", header="Issue ID"),
+    Column("assignee", header="Assignee"),
+    Column("time_spent", "duration", header="Total Time Spent", unit="s", text=str, missing="No time logged")
+]
+# Written after the issues in CSV, to a sibling ".totals" file otherwise
+TOTAL_COLUMNS = [
+    Column("assignee", header="Assignee"),
+    Column("issues", "int", header="Issues"),
+    Column("time_spent", "duration", header="Total Time Spent", unit="s", text=str)
+]
 
-# Headers for authentication
-headers = {
-    "Authorization": f"Bearer {TOKEN}"
-}
+client = GitLabClient(API_URL, TOKEN, pool_size=MAX_WORKERS)
 
-def fetch_issues(group_id):
-    """ Fetch issues from a specific group """
-    response = requests.get(f"{API_URL}/groups/{group_id}/issues", headers=headers)
-    return response.json()
+def fetch_issues(group_id, assignee_id=None):
+    """ Fetch every issue from a specific group, optionally only those assigned to one user """
+    params = {"per_page": 100}
+    if assignee_id:
+        params["assignee_id"] = assignee_id
+    for data in client.iter_pages(f"groups/{group_id}/issues", params):
+        with metrics.stage("transform"):
+            records = list(map(IssueRecord.from_json, data))
+        yield from records
 
 def filter_issues_by_assignee(issues, assignee_ids):
     """ Filter issues by specific assignee IDs """
-    filtered_issues = [issue for issue in issues if issue['assignee'] and issue['assignee']['id'] in assignee_ids]
-    return filtered_issues
-
-def write_to_csv(issues):
-    """ Write issues data to a CSV file """
-    with open(CSV_FILE, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        # Write headers
-        writer.writerow(['Issue ID', 'Assignee', 'Total Time Spent'])
-        # Write issue data
+    assignee_ids = set(assignee_ids)
+    return (issue for issue in issues if issue.assignee_id in assignee_ids)
+
+def fetch_assignee_issues(group_id, assignee_id):
+    """ Fetch one engineer's issues, keeping those where they are the (first) assignee """
+    return list(filter_issues_by_assignee(fetch_issues(group_id, assignee_id), [assignee_id]))
+
+def fetch_engineer_issues(group_id, engineer_ids):
+    """ Yield the issues of the given engineers, either per engineer in parallel or from the whole group """
+    if not PER_ASSIGNEE:
+        yield from filter_issues_by_assignee(fetch_issues(group_id), engineer_ids)
+        return
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for issues in executor.map(lambda assignee_id: fetch_assignee_issues(group_id, assignee_id), engineer_ids):
+            yield from issues
+
+def write_output(issues):
+    """ Write issues data to a CSV file (or OUTPUT_FORMAT), followed by each engineer's totals """
+    totals = {}  # Assignee name -> [issue count, total time spent]
+    with open_sink(CSV_FILE, OUTPUT_COLUMNS, OUTPUT_FORMAT) as sink:
+        # Write issue data, adding up totals as it streams in
         for issue in issues:
-            time_spent = issue.get('time_stats', {}).get('total_time_spent', 'No time logged')
-            assignee_name = issue['assignee']['name'] if issue['assignee'] else 'Unassigned'
-            writer.writerow([issue['id'], assignee_name, time_spent])
+            with metrics.stage("write"):
+                assignee_name = issue.assignee_name or 'Unassigned'
+                sink.write([issue.id, assignee_name, issue.time_spent])
+                total = totals.setdefault(assignee_name, [0, 0])
+                total[0] += 1
+                total[1] += issue.time_spent or 0
+
+        with sink.table("totals", TOTAL_COLUMNS) as table:
+            for assignee_name, (count, time_spent) in totals.items():
+                table.write([assignee_name, count, time_spent])
+    return totals
 
 def main():
-    issues = fetch_issues(GROUP_ID)
-    # Specify the IDs of the engineers
-    engineer_ids = [x, xx, xxx]  # Example IDs
-    specific_issues = filter_issues_by_assignee(issues, engineer_ids)
-    
-    # Export to CSV
-    write_to_csv(specific_issues)
+    try:
+        with profiling(PROFILE):
+            issues = fetch_engineer_issues(GROUP_ID, ENGINEER_IDS)
+
+            # Export
+            write_output(issues)
+    finally:
+        if METRICS_PATH:
+            metrics.write(METRICS_PATH, job="time_export")
     print(f"Data has been exported to {CSV_FILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()